@@ -0,0 +1,116 @@
+import random
+from p2_t3 import won_boards
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Runs many random playouts of Ultimate Tic-Tac-Toe side by side with NumPy. Each game keeps its 18
+# sub-board bitmasks and 2 big-board bitmasks in one row of an (N, 20) uint16 array, laid out like
+# the first 20 entries of a Board state tuple. NumPy is optional: without it, or for fewer than
+# BATCH_MIN_PLAYOUTS playouts, leaf_wins falls back to calling Board.random_playout k times. Boards with
+# a playout_wins method (fast_board.FastBoard) run the k playouts themselves.
+
+# Fewest playouts worth a batch_playout call. A batch has a fixed cost of about 3.5ms (80 Board.random_playout
+# calls), so below this leaf_wins loops random_playout; on Board the batch first wins at about 170-200 playouts.
+BATCH_MIN_PLAYOUTS = 200
+
+if np is not None:
+    _won = np.array(won_boards, dtype=bool)
+    _popcount = np.array([bin(m).count('1') for m in range(512)], dtype=np.int16)
+    # _nth_bit[mask, k] is the index of the k-th set bit of mask (0 where there is none).
+    _nth_bit = np.zeros((512, 9), dtype=np.int16)
+    for _mask in range(512):
+        for _k, _i in enumerate(i for i in range(9) if _mask >> i & 1):
+            _nth_bit[_mask, _k] = _i
+    _board_bits = np.arange(9, dtype=np.uint16)
+    _rng = np.random.default_rng()
+
+
+def batch_playout(state, n, rng=None):
+    """ Plays n independent random games from state at once.
+
+    Args:
+        state:  A Board state tuple.
+        n:      The number of playouts.
+        rng:    A numpy.random.Generator; a module-level generator is used when omitted.
+
+    Returns:    An int8 array of n winners: 1 or 2, or 0 for a draw.
+
+    """
+    if rng is None:
+        rng = _rng
+
+    b = np.tile(np.array(state[:20], dtype=np.uint16), (n, 1))
+    constraint = np.full(n, -1 if state[20] is None else 3 * state[20] + state[21], dtype=np.int16)
+    me = np.full(n, state[22] - 1, dtype=np.int16)
+    winners = np.zeros(n, dtype=np.int8)
+    games = np.arange(n)
+    at = np.arange(n)
+
+    while True:
+        # Record finished games and drop them from the working arrays.
+        p1, p2 = b[:, 18], b[:, 19]
+        p1_won = _won[p1 & ~p2]
+        p2_won = _won[p2 & ~p1]
+        ended = p1_won | p2_won | ((p1 | p2) == 0x1ff)
+        if ended.any():
+            winners[games[p1_won]] = 1
+            winners[games[p2_won & ~p1_won]] = 2
+            keep = ~ended
+            b, constraint, me, games = b[keep], constraint[keep], me[keep], games[keep]
+            if not games.size:
+                return winners
+            at = np.arange(games.size)
+
+        # Legal cells per sub-board: empty, in an unfinished board, in the required board if any.
+        finished = b[:, 18] | b[:, 19]
+        free = ~(b[:, 0:18:2] | b[:, 1:18:2]) & 0x1ff
+        free[((finished[:, None] >> _board_bits) & 1).astype(bool)] = 0
+        free[(constraint[:, None] >= 0) & (_board_bits != constraint[:, None])] = 0
+
+        # Pick a uniformly random legal move per game via the set-bit lookup.
+        counts = _popcount[free]
+        totals = counts.cumsum(axis=1)
+        pick = (rng.random(games.size) * totals[:, -1]).astype(np.int16)
+        x = (totals > pick[:, None]).argmax(axis=1)
+        cell = _nth_bit[free[at, x], pick - totals[at, x] + counts[at, x]]
+
+        # Place the piece and update sub-board ownership.
+        own_col = 2 * x + me
+        own = b[at, own_col] | (1 << cell).astype(np.uint16)
+        b[at, own_col] = own
+        won = _won[own]
+        full = ~won & ((own | b[at, own_col ^ 1]) == 0x1ff)
+        board_bit = (1 << x).astype(np.uint16)
+        b[at[won], 18 + me[won]] |= board_bit[won]
+        b[full, 18] |= board_bit[full]
+        b[full, 19] |= board_bit[full]
+
+        finished = b[:, 18] | b[:, 19]
+        constraint = np.where((finished >> cell.astype(np.uint16)) & 1, -1, cell).astype(np.int16)
+        me = 1 - me
+
+
+def leaf_wins(board, state, k, identity, rng=random):
+    """ Estimates a leaf by running k random playouts from it.
+
+    Args:
+        board:      The game setup.
+        state:      The state of the game at the leaf.
+        k:          The number of playouts.
+        identity:   The player whose wins are counted.
+        rng:        Source of randomness: drawn from directly by the pure-Python fallback, and for the seed of
+                    playout_wins or of the NumPy generator batch_playout runs on.
+
+    Returns:    The number of the k playouts won by identity.
+
+    """
+    if hasattr(board, 'playout_wins'):
+        return board.playout_wins(state, k, identity, rng)
+    if np is None or k < BATCH_MIN_PLAYOUTS:
+        return sum(board.random_playout(state, rng) == identity for _ in range(k))
+    if hasattr(board, 'to_tuple'):
+        state = board.to_tuple(state)
+    return int((batch_playout(state, k, np.random.default_rng(rng.getrandbits(64))) == identity).sum())
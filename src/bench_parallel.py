@@ -0,0 +1,40 @@
+import sys
+import random
+from timeit import default_timer as time
+import p2_t3
+import mcts_vanilla
+import mcts_parallel
+from mcts_node import MCTSNode
+
+# Reports MCTS playouts per second from the opening position for the serial search and for
+# tree-parallel search at increasing worker counts.
+#
+#   python bench_parallel.py [iterations] [max_workers]
+
+iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else mcts_parallel.workers
+
+board = p2_t3.Board()
+state0 = board.starting_state()
+
+
+def rate(search):
+    random.seed(0)
+    root_node = MCTSNode(parent=None, parent_action=None, action_list=board.legal_actions(state0))
+    start = time()
+    search(board, root_node, state0, iterations)
+    return iterations / (time() - start)
+
+
+if __name__ == "__main__":
+    serial = rate(mcts_vanilla.search)
+    print("%-20s %10.0f playouts/s" % ("serial", serial))
+
+    print("tree-parallel on %s" % ("threads" if mcts_parallel.free_threaded() else "processes"))
+    workers = 1
+    while workers <= max_workers:
+        mcts_parallel.workers = workers
+        mcts_parallel.get_playout_pool()    # Keep pool start-up out of the measurement.
+        parallel = rate(mcts_parallel.tree_search)
+        print("%-20s %10.0f playouts/s  (%.2fx serial)" % ("%d workers" % workers, parallel, parallel / serial))
+        workers *= 2
@@ -0,0 +1,58 @@
+import sys
+import random
+from contextlib import redirect_stdout
+import os
+from timeit import default_timer as time
+import p2_t3
+import mcts_vanilla
+import playout_policy
+
+# Compares the playout policies of playout_policy.py: first their playouts per second from the start
+# position, then their strength per CPU-second, by playing mcts_vanilla with a heavier policy against
+# mcts_vanilla with random playouts at the same wall-clock budget per move. Sides alternate and game i
+# is seeded with i.
+#
+#   python bench_playout.py [games] [ms per move] [policy]
+
+games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+time_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 100
+challenger = sys.argv[3] if len(sys.argv) > 3 else 'heavy'
+playouts = 2000
+
+board = p2_t3.Board()
+state0 = board.starting_state()
+
+baseline = None
+for policy in playout_policy.policies:
+    random.seed(0)
+    start = time()
+    for _ in range(playouts):
+        playout_policy.playout(board, state0, policy)
+    rate = playouts / (time() - start)
+    if baseline is None:
+        baseline = rate
+    print("%-8s %10.0f playouts/s  (%.2fx)" % (policy, rate, rate / baseline))
+
+
+def play_game(seed: int):
+    """ Plays one game with the challenger policy as player 2 - seed % 2 and returns the winner. """
+    random.seed(seed)
+    policies = {2 - seed % 2: challenger, 1 + seed % 2: 'random'}
+    state = state0
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        while not board.is_ended(state):
+            mcts_vanilla.rollout_policy = policies[board.current_player(state)]
+            state = board.next_state(state, mcts_vanilla.think(board, state, time_ms=time_ms))
+    score = board.points_values(state)
+    return 0 if score[1] == 0 else (1 if score[1] == 1 else 2), policies
+
+
+wins = draws = 0
+for seed in range(games):
+    winner, policies = play_game(seed)
+    if winner == 0:
+        draws += 1
+    elif policies[winner] == challenger:
+        wins += 1
+print("%s vs random at %gms/move: %d wins, %d losses, %d draws in %d games (score %.2f)"
+      % (challenger, time_ms, wins, games - wins - draws, draws, games, (wins + draws / 2) / games))
@@ -0,0 +1,75 @@
+import sys
+import random
+from timeit import default_timer as time
+import p2_t3
+import mcts_vanilla
+import fast_board
+import numba_rollout
+
+# Compares rollouts per second of the per-ply Board API path used by mcts_vanilla.rollout
+# against the single-loop Board.random_playout kernel, and against the compiled playouts of
+# fast_board.FastBoard when the _fast_board extension is built and of numba_rollout.NumbaBoard
+# when Numba is installed (after warm_up, so compile time is not counted).
+#
+#   python bench_rollout.py [rollouts]
+
+rollouts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+board = p2_t3.Board()
+packed_board = p2_t3.PackedBoard()
+state0 = board.starting_state()
+
+
+def api_rollout():
+    state = mcts_vanilla.rollout(board, state0)
+    return mcts_vanilla.is_win(board, state, 1)
+
+
+def playout_rollout():
+    return board.random_playout(state0) == 1
+
+
+def packed_playout_rollout():
+    return packed_board.random_playout(packed_board.starting_state()) == 1
+
+
+def compiled_playout_rollout(fast):
+    return lambda: fast.random_playout(state0) == 1
+
+
+def compiled_batch_rollout(fast):
+    # One call per 100 playouts, as leaf_wins makes for rollouts_per_leaf = 100; counted as 1/100 of a call.
+    batch_left = 0
+
+    def rollout():
+        nonlocal batch_left
+        if batch_left == 0:
+            fast.playout_wins(state0, 100, 1)
+            batch_left = 100
+        batch_left -= 1
+    return rollout
+
+
+benchmarks = [("rollout + is_win", api_rollout),
+              ("Board.random_playout", playout_rollout),
+              ("PackedBoard.random_playout", packed_playout_rollout)]
+if fast_board.lib is not None:
+    fast = fast_board.FastBoard()
+    benchmarks += [("FastBoard.random_playout", compiled_playout_rollout(fast)),
+                   ("FastBoard.playout_wins", compiled_batch_rollout(fast))]
+if numba_rollout.jit is not None:
+    numba_rollout.warm_up()
+    fast = numba_rollout.NumbaBoard()
+    benchmarks += [("NumbaBoard.random_playout", compiled_playout_rollout(fast)),
+                   ("NumbaBoard.playout_wins", compiled_batch_rollout(fast))]
+
+baseline = None
+for name, fn in benchmarks:
+    random.seed(0)
+    start = time()
+    for _ in range(rollouts):
+        fn()
+    rate = rollouts / (time() - start)
+    if baseline is None:
+        baseline = rate
+    print("%-28s %10.0f rollouts/s  (%.1fx)" % (name, rate, rate / baseline))
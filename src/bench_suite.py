@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tracemalloc
+from contextlib import redirect_stdout
+from time import perf_counter
+import p2_t3
+import mcts_vanilla
+from mcts_node import MCTSNode
+
+# Benchmarks the Board primitives and the MCTS steps on a recorded corpus of opening, middle game and
+# endgame positions (bench_positions.json). Every benchmark is run once per phase: each sample runs the
+# operation over all positions of the phase, and the report gives ops/s (from the median sample),
+# the 50th/90th/99th percentile of the time per operation over the samples, and the peak memory
+# allocated during one more sample traced by tracemalloc. The random module is seeded before every
+# setup and sample, so runs are comparable.
+#
+#   python bench_suite.py --out bench.json                  runs the suite and saves the results
+#   python bench_suite.py --baseline bench.json             compares against saved results
+#   python bench_suite.py --only rollout think --samples 5  runs some of the benchmarks
+#   python bench_suite.py --record                          re-records the position corpus
+#
+# With --baseline, a benchmark whose ops/s drops by more than --tolerance is reported as a regression and
+# the exit status is 1.
+
+corpus_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_positions.json')
+phases = ('opening', 'middle', 'endgame')
+tree_iterations = 500   # Iterations searched to build the trees that traverse_nodes and backpropagate run on.
+think_nodes = 200       # num_nodes for the think benchmark.
+think_positions = 4     # Positions per phase that the think benchmark searches from.
+
+board = p2_t3.Board()
+
+
+def record_corpus(per_phase: int = 20, seed: int = 0):
+    """ Records positions from random games: the position after 6 moves (opening), after 24 moves (middle
+    game) and 12 moves before the end (endgame). Games that end too early for a phase are skipped for it.
+
+    Args:
+        per_phase:  The number of positions per phase.
+        seed:       The seed of game 0; game i uses seed + i.
+
+    Returns:    A phase -> list of states dictionary.
+
+    """
+    corpus = {phase: [] for phase in phases}
+    game = seed
+    while any(len(states) < per_phase for states in corpus.values()):
+        rng = random.Random(game)
+        game += 1
+        history = [board.starting_state()]
+        while not board.is_ended(history[-1]):
+            history.append(board.next_state(history[-1], rng.choice(board.legal_actions(history[-1]))))
+        picks = dict(opening=6, middle=24, endgame=len(history) - 13)
+        for phase, ply in picks.items():
+            if 6 <= ply < len(history) - 12 and len(corpus[phase]) < per_phase:
+                corpus[phase].append(history[ply])
+    return corpus
+
+
+def load_corpus(path: str = corpus_path):
+    """ Loads the position corpus saved by --record as a phase -> list of state tuples dictionary. """
+    with open(path) as corpus_file:
+        return {phase: [tuple(state) for state in states] for phase, states in json.load(corpus_file).items()}
+
+
+def grow_tree(state):
+    """ Searches tree_iterations iterations from state and returns the root. """
+    root_node = MCTSNode(parent=None, parent_action=None, action_list=board.legal_actions(state))
+    mcts_vanilla.search(board, root_node, state, tree_iterations)
+    return root_node
+
+
+def deepest_leaf(node):
+    """ Returns the deepest node below node, following the most visited child. """
+    while node.child_nodes:
+        node = max(node.child_nodes.values(), key=lambda child: child.visits)
+    return node
+
+
+# Each setup takes the states of a phase and returns a function running one sample, and the number of
+# operations that sample performs.
+
+def setup_next_state(states):
+    pairs = [(state, action) for state in states for action in board.legal_actions(state)]
+    def run():
+        for state, action in pairs:
+            board.next_state(state, action)
+    return run, len(pairs)
+
+
+def setup_legal_actions(states):
+    def run():
+        for _ in range(50):
+            for state in states:
+                board.legal_actions(state)
+    return run, 50 * len(states)
+
+
+def setup_is_ended(states):
+    def run():
+        for _ in range(50):
+            for state in states:
+                board.is_ended(state)
+    return run, 50 * len(states)
+
+
+def setup_rollout(states):
+    def run():
+        for state in states:
+            mcts_vanilla.rollout(board, state)
+    return run, len(states)
+
+
+def setup_traverse_nodes(states):
+    trees = [(grow_tree(state), state) for state in states]
+    def run():
+        for _ in range(10):
+            for root_node, state in trees:
+                mcts_vanilla.traverse_nodes(root_node, board, state, board.current_player(state))
+    return run, 10 * len(trees)
+
+
+def setup_backpropagate(states):
+    leaves = [deepest_leaf(grow_tree(state)) for state in states]
+    def run():
+        for _ in range(10):
+            for leaf in leaves:
+                mcts_vanilla.backpropagate(leaf, True)
+    return run, 10 * len(leaves)
+
+
+def setup_think(states):
+    states = states[:think_positions]
+    def run():
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for state in states:
+                mcts_vanilla.think(board, state, nn=think_nodes)
+    return run, len(states)
+
+
+benchmarks = dict(
+    next_state=setup_next_state,
+    legal_actions=setup_legal_actions,
+    is_ended=setup_is_ended,
+    rollout=setup_rollout,
+    traverse_nodes=setup_traverse_nodes,
+    backpropagate=setup_backpropagate,
+    think=setup_think,
+)
+
+
+def percentile(values, q: float):
+    """ Returns the nearest-rank q-th percentile (0 < q <= 100) of values. """
+    ordered = sorted(values)
+    return ordered[max(0, int(-(-len(ordered) * q // 100)) - 1)]
+
+
+def measure(setup, states, samples: int, seed: int):
+    """ Times one benchmark on one phase.
+
+    Args:
+        setup:      A benchmark setup function.
+        states:     The positions of the phase.
+        samples:    The number of timed samples.
+        seed:       The seed for the random module before the setup and each sample.
+
+    Returns:    A dictionary with ops_per_sec, p50_us, p90_us, p99_us (per operation), peak_kib and samples.
+
+    """
+    random.seed(seed)
+    run, ops = setup(states)
+
+    times = []
+    for _ in range(samples):
+        random.seed(seed)
+        start = perf_counter()
+        run()
+        times.append((perf_counter() - start) / ops)
+
+    random.seed(seed)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return dict(
+        ops_per_sec=1 / percentile(times, 50),
+        p50_us=percentile(times, 50) * 1e6,
+        p90_us=percentile(times, 90) * 1e6,
+        p99_us=percentile(times, 99) * 1e6,
+        peak_kib=peak / 1024,
+        samples=samples,
+    )
+
+
+def run_suite(corpus, names, samples: int, seed: int):
+    """ Runs the named benchmarks on every phase of the corpus, printing each result as it finishes.
+
+    Returns:    A "benchmark/phase" -> measure() result dictionary.
+
+    """
+    results = {}
+    for name in names:
+        for phase in phases:
+            key = "%s/%s" % (name, phase)
+            results[key] = result = measure(benchmarks[name], corpus[phase], samples, seed)
+            print("%-24s %12.0f ops/s  p50 %10.2fus  p90 %10.2fus  p99 %10.2fus  peak %9.1fKiB" % (
+                key, result['ops_per_sec'], result['p50_us'], result['p90_us'], result['p99_us'], result['peak_kib']))
+    return results
+
+
+def compare(results, baseline, tolerance: float):
+    """ Prints each benchmark's ops/s against the baseline's and returns the keys that regressed by more than
+    tolerance (a fraction of the baseline's ops/s).
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result['ops_per_sec'] / baseline[key]['ops_per_sec']
+        regressed = ratio < 1 - tolerance
+        if regressed:
+            regressions.append(key)
+        print("%-24s %6.2fx baseline%s" % (key, ratio, "  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks Board primitives and MCTS steps on recorded positions.")
+    parser.add_argument('--only', nargs='+', choices=list(benchmarks), default=list(benchmarks),
+                        help="benchmarks to run (default: all)")
+    parser.add_argument('--samples', type=int, default=10, help="timed samples per benchmark and phase")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="JSON file to save the results to")
+    parser.add_argument('--baseline', help="JSON results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="fractional drop in ops/s counted as a regression (default 0.2)")
+    parser.add_argument('--record', action='store_true', help="re-record the position corpus and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        with open(corpus_path, 'w') as corpus_file:
+            json.dump(record_corpus(), corpus_file)
+        return
+
+    results = run_suite(load_corpus(), args.only, args.samples, args.seed)
+
+    if args.out:
+        with open(args.out, 'w') as out_file:
+            json.dump(dict(
+                python=platform.python_version(),
+                implementation=platform.python_implementation(),
+                machine=platform.machine(),
+                seed=args.seed,
+                results=results,
+            ), out_file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import sys
+import random
+import tracemalloc
+from timeit import default_timer as time
+import p2_t3
+import mcts_vanilla
+import tree_store
+from mcts_node import MCTSNode, last_max_index
+
+# Compares the MCTSNode tree with the array-backed TreeStore: memory per node after a search, and the
+# cost of a selection walk from the root to a leaf. Both walks do the same work at every level: pick the
+# child with the highest UCB (explore_faction, last of the ties in expansion order) from the tree's own
+# statistics, and advance the state to it with next_state.
+#
+#   python bench_tree_store.py [iterations] [walks]
+
+iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+walks = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+board = p2_t3.Board()
+state0 = board.starting_state()
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in node.child_list)
+
+
+def node_tree():
+    root_node = MCTSNode(parent=None, parent_action=None, action_list=board.legal_actions(state0))
+    mcts_vanilla.search(board, root_node, state0, iterations)
+    return root_node, count_nodes(root_node)
+
+
+def store_tree():
+    store = tree_store.TreeStore()
+    store.add(tree_store.NONE, tree_store.NONE, board.legal_actions(state0))
+    tree_store.store_search(board, store, state0, iterations)
+    return store, store.size
+
+
+def node_walk(root_node):
+    node, state = root_node, state0
+    while node.child_list:
+        node = node.child_list[last_max_index(node.child_ucb_scores(mcts_vanilla.explore_faction))]
+        state = board.next_state(state, node.parent_action)
+
+
+def store_walk(store):
+    i, state = 0, state0
+    while store.first_child[i] != tree_store.NONE:
+        i = tree_store.best_child(store, i)
+        state = board.next_state(state, p2_t3.decode_action(store.action[i]))
+
+
+if __name__ == "__main__":
+    for name, build, walk in [("MCTSNode", node_tree, node_walk), ("TreeStore", store_tree, store_walk)]:
+        random.seed(0)
+        tracemalloc.start()
+        tree, nodes = build()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time()
+        for _ in range(walks):
+            walk(tree)
+        walk_us = (time() - start) / walks * 1e6
+
+        print("%-10s %7d nodes  %6.0f bytes/node  %7.1f us/selection walk" % (name, nodes, memory / nodes, walk_us))
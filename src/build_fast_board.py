@@ -0,0 +1,27 @@
+import os
+import shutil
+from cffi import FFI
+
+# Builds the optional _fast_board extension from fast_board.c with cffi (pip install cffi, plus a C
+# compiler). fast_board.py uses it when it is importable and falls back to the pure-Python Board otherwise.
+#
+#   python build_fast_board.py
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+ffibuilder = FFI()
+ffibuilder.cdef("""
+    int fb_next_state(uint16_t *m, int player, int code);
+    int fb_legal_codes(const uint16_t *m, int constraint, uint8_t *out);
+    int fb_is_ended(const uint16_t *m);
+    int fb_random_playout(const char *state, int constraint, int player, uint64_t seed, uint8_t *trace);
+    void fb_random_playouts(const char *state, int constraint, int player, uint64_t seed, int n, int *winners);
+""")
+with open(os.path.join(here, 'fast_board.c')) as source:
+    ffibuilder.set_source('_fast_board', source.read(), extra_compile_args=['-O3'])
+
+
+if __name__ == "__main__":
+    built = ffibuilder.compile(tmpdir=os.path.join(here, 'build'))
+    shutil.copy(built, here)
+    print("Built %s" % os.path.join(here, os.path.basename(built)))
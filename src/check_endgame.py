@@ -0,0 +1,62 @@
+import sys
+import random
+from timeit import default_timer as time
+import p2_t3
+import endgame
+import mcts_vanilla
+
+# Checks the endgame solver against a plain minimax without memo or pruning. Random games are played until
+# at most `cells` empty cells remain; each such position is solved with endgame.solve and endgame.best_action
+# on a Board and on a PackedBoard, and every result must match the minimax value. The solver-enabled
+# mcts_vanilla.think must also run on both boards.
+#
+#   python check_endgame.py [positions] [cells] [seed]
+
+positions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+cells = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+board = p2_t3.Board()
+packed_board = p2_t3.PackedBoard()
+
+
+def minimax(state):
+    """ Returns the value of state for the player to move: 1, 0 or -1. """
+    outcome = board.points_values(state)
+    if outcome is not None:
+        return outcome[board.current_player(state)]
+    return max(-minimax(board.next_state(state, action)) for action in board.legal_actions(state))
+
+
+def endgame_position(rng):
+    """ Plays random moves until at most `cells` empty cells are left and returns that state (or None). """
+    state = board.starting_state()
+    while not board.is_ended(state):
+        if endgame.empty_cells(board, state) <= cells:
+            return state
+        state = board.next_state(state, rng.choice(board.legal_actions(state)))
+    return None
+
+
+if __name__ == "__main__":
+    rng = random.Random(seed)
+    mcts_vanilla.solver_empty_cells = cells
+    mcts_vanilla.num_nodes = 50
+    checked = 0
+    start = time()
+    while checked < positions:
+        state = endgame_position(rng)
+        if state is None:
+            continue
+        expected = minimax(state)
+        for test_board, test_state in ((board, state), (packed_board, packed_board.from_tuple(state))):
+            endgame.memo.clear()
+            assert endgame.empty_cells(test_board, test_state) == endgame.empty_cells(board, state), state
+            assert endgame.solve(test_board, test_state, 10 ** 9) == expected, (state, test_board)
+            action, value = endgame.best_action(test_board, test_state, 10 ** 9)
+            assert value == expected, (state, test_board)
+            assert -minimax(board.next_state(state, action)) == expected, (state, action)
+            assert test_board.is_legal(test_state, mcts_vanilla.think(test_board, test_state))
+        checked += 1
+
+    print("%d positions agree (%.0fs)" % (checked, time() - start))
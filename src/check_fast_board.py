@@ -0,0 +1,72 @@
+import sys
+import random
+from timeit import default_timer as time
+import p2_t3
+from fast_board import FastBoard, ffi, lib
+
+# Differential test of the _fast_board C core against the pure-Python Board. Random games are played with
+# Board, and at every position reached the C next_state (for every legal action), legal_actions and
+# is_ended must agree with Board's. Every 10th position, a seeded C playout is also replayed move by
+# move with Board: each move must be legal and the game must end with the winner the C playout reported.
+#
+#   python check_fast_board.py [positions] [seed]
+
+positions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+board = p2_t3.Board()
+fast_board = FastBoard()
+masks = ffi.new("uint16_t[20]")
+codes = ffi.new("uint8_t[81]")
+
+
+def c_next_state(state, action):
+    masks[0:20] = state[:20]
+    constraint = lib.fb_next_state(masks, state[22], p2_t3.encode_action(action))
+    return tuple(masks) + ((None, None) if constraint < 0 else divmod(constraint, 3)) + (3 - state[22],)
+
+
+def c_legal_actions(state):
+    masks[0:20] = state[:20]
+    n = lib.fb_legal_codes(masks, -1 if state[20] is None else 3 * state[20] + state[21], codes)
+    return [p2_t3.decode_action(code) for code in ffi.unpack(codes, n)]
+
+
+def c_is_ended(state):
+    masks[0:20] = state[:20]
+    return bool(lib.fb_is_ended(masks))
+
+
+def check_playout(state, playout_seed):
+    winner, trace = fast_board.playout_trace(state, playout_seed)
+    for code in trace:
+        if board.is_ended(state):
+            break
+        action = p2_t3.decode_action(code)
+        assert board.is_legal(state, action), (state, action)
+        state = board.next_state(state, action)
+    score = board.points_values(state)
+    assert winner == (1 if score[1] == 1 else 2 if score[2] == 1 else 0), (state, winner)
+
+
+if __name__ == "__main__":
+    rng = random.Random(seed)
+    checked = 0
+    start = time()
+    while checked < positions:
+        state = board.starting_state()
+        while checked < positions:
+            actions = board.legal_actions(state)
+            assert c_legal_actions(state) == actions, state
+            ended = board.is_ended(state)
+            assert c_is_ended(state) == bool(ended), state
+            for action in actions:
+                assert c_next_state(state, action) == board.next_state(state, action), (state, action)
+            if checked % 10 == 0:
+                check_playout(state, rng.getrandbits(64))
+            checked += 1
+            if ended:
+                break
+            state = board.next_state(state, rng.choice(actions))
+
+    print("%d positions agree (%.0fs)" % (checked, time() - start))
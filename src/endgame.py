@@ -0,0 +1,131 @@
+from p2_t3 import Board, empty_indices
+
+# An exact endgame solver: alpha-beta negamax over Board.next_state and Board.points_values, scoring
+# positions as 1 (the player to move wins), 0 (draw) or -1 (the player to move loses).
+#
+# Results are memoised by state across calls, as exact values or as the bounds an alpha-beta cutoff
+# proves, so a position solved once (or reached again by transposition) costs one lookup. Each solve has
+# a node budget; when it runs out the solve gives up and returns None, keeping whatever it had proven.
+
+memo_size = 1000000     # Entries kept in the memo table before it is cleared.
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+memo = {}   # State -> (flag, value): the value is exact, or a lower or upper bound on it.
+
+
+class BudgetExceeded(Exception):
+    """ Raised inside a solve that has searched more positions than its budget. """
+
+
+def empty_cells(board: Board, state):
+    """ Returns the number of empty cells left in the sub-boards of state that are still open. """
+    if hasattr(board, 'to_tuple'):
+        state = board.to_tuple(state)
+    finished = state[18] | state[19]
+    return sum(
+        len(empty_indices[state[2 * x] | state[2 * x + 1]])
+        for x in range(9)
+        if not finished >> x & 1
+    )
+
+
+class Solver:
+    """ One budgeted alpha-beta search sharing the module memo table. """
+
+    def __init__(self, board: Board, max_nodes: int):
+        self.board = board
+        self.max_nodes = max_nodes
+        self.nodes = 0
+
+    def negamax(self, state, alpha: int, beta: int):
+        """ Returns the value of state for the player to move, exact if it lies strictly between alpha and beta. """
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise BudgetExceeded()
+
+        entry = memo.get(state)
+        if entry is not None:
+            flag, value = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        board = self.board
+        outcome = board.points_values(state)
+        if outcome is not None:
+            value = outcome[board.current_player(state)]
+            memo[state] = (EXACT, value)
+            return value
+
+        original_alpha = alpha
+        best = -1
+        for action in board.legal_actions(state):
+            value = -self.negamax(board.next_state(state, action), -beta, -alpha)
+            if value > best:
+                best = value
+                if best > alpha:
+                    alpha = best
+                    if alpha >= beta:
+                        break
+
+        if best <= original_alpha:
+            memo[state] = (UPPER, best)
+        elif best >= beta:
+            memo[state] = (LOWER, best)
+        else:
+            memo[state] = (EXACT, best)
+        return best
+
+
+def solve(board: Board, state, max_nodes: int):
+    """ Solves a position exactly.
+
+    Args:
+        board:      The game setup.
+        state:      The state to solve.
+        max_nodes:  The most positions to search before giving up.
+
+    Returns:    1, 0 or -1 for a win, draw or loss of the player to move, or None if the budget ran out.
+
+    """
+    if len(memo) > memo_size:
+        memo.clear()
+    try:
+        return Solver(board, max_nodes).negamax(state, -1, 1)
+    except BudgetExceeded:
+        return None
+
+
+def best_action(board: Board, state, max_nodes: int):
+    """ Finds a move that reaches the best result the player to move can force.
+
+    Args:
+        board:      The game setup.
+        state:      The current state of the game (not ended).
+        max_nodes:  The most positions to search before giving up.
+
+    Returns:
+        action: The chosen action, or None if the budget ran out
+        value: Its value for the player to move (1, 0 or -1), or None
+
+    """
+    if len(memo) > memo_size:
+        memo.clear()
+    solver = Solver(board, max_nodes)
+    best, best_value = None, -2
+    try:
+        for action in board.legal_actions(state):
+            value = -solver.negamax(board.next_state(state, action), -1, -max(best_value, -1))
+            if value > best_value:
+                best, best_value = action, value
+                if best_value == 1:
+                    break
+    except BudgetExceeded:
+        return None, None
+    return best, best_value
@@ -1,13 +1,13 @@
 
 from mcts_node import MCTSNode
-from p2_t3 import Board
+from p2_t3 import Board, decode_action
 from random import choice
 from math import sqrt, log
 
 num_nodes = 1000
 explore_faction = 2.
 
-def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int):
+def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int, explore: float|None = None):
     """ Traverses the tree until the end criterion are met.
     e.g. find the best expandable node (node with untried action) if it exist,
     or else a terminal node
@@ -17,6 +17,7 @@ def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int):
         board:      The game setup.
         state:      The state of the game.
         identity:   The bot's identity, either 1 or 2
+        explore:    The exploration constant; defaults to explore_faction.
 
     Returns:
         node: A node from which the next stage of the search can proceed.
@@ -29,15 +30,14 @@ def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int):
     new_state = state
 
     # grabbing bounds
-    for child in node.child_nodes:
-        cur_child = node.child_nodes[child]
-        UCB = ucb(cur_child, False)
+    for cur_child in node.child_list:
+        UCB = ucb(cur_child, False, explore)
         if UCB >= top_UCB:
             top_UCB = UCB
             best_child = cur_child
     
-    # setting best child and updating state
-    if best_child.parent_action != None:
+    # setting best child and updating state (a node returned as its own best child keeps the state it was given)
+    if best_child is not node:
         new_state = board.next_state(state, best_child.parent_action)
     return best_child, new_state
 
@@ -54,15 +54,15 @@ def expand_leaf(node: MCTSNode, board: Board, state):
         state: The state associated with that node
 
     """
-    if node.untried_actions:
+    if node.untried:
         # Select an untried action
-        action = node.untried_actions.pop()
+        action = decode_action(node.pop_untried())
         
         # Ensure the action is legal
         if board.is_legal(state, action):
             # Create a new child node
             new_node = MCTSNode(parent=node, parent_action=action, action_list=board.legal_actions(board.next_state(state, action)))
-            node.child_nodes[action] = new_node
+            node.add_child(action, new_node)
             
             # Update the current state based on the selected action
             state = board.next_state(state, action)
@@ -111,23 +111,26 @@ def backpropagate(node: MCTSNode|None, won: bool):
         node = node.parent
 
 
-def ucb(node: MCTSNode, is_opponent: bool):
+def ucb(node: MCTSNode, is_opponent: bool, ef: float|None = None):
     """ Calcualtes the UCB value for the given node from the perspective of the bot
 
     Args:
         node:   A node.
         is_opponent: A boolean indicating whether or not the last action was performed by the MCTS bot
+        ef:     The exploration constant; defaults to explore_faction.
     Returns:
         The value of the UCB function for the given node
     """
     if node.visits == 0:
         return 0
+    if ef is None:
+        ef = explore_faction
     if is_opponent:
         exploit = node.wins / node.visits
-        explore = explore_faction * sqrt(2 * log(node.parent.visits) / node.visits)
+        explore = ef * sqrt(2 * log(node.parent.visits) / node.visits)
     else:
         exploit = node.wins / node.visits
-        explore = explore_faction * sqrt(2 * log(node.visits) / node.visits)
+        explore = ef * sqrt(2 * log(node.visits) / node.visits)
     UCB = exploit + explore
     return UCB
 
@@ -143,11 +146,10 @@ def get_best_action(root_node: MCTSNode):
     best = float("-inf")
     best_action = None
     # go through root children and find best winrate 
-    for child in root_node.child_nodes:
-        cur_child = root_node.child_nodes[child]
+    for cur_child in root_node.child_list:
         if cur_child.wins / cur_child.visits >= best:
             best = cur_child.wins / cur_child.visits
-            best_action = child
+            best_action = cur_child.parent_action
     return best_action
 
 
@@ -163,44 +165,37 @@ def think(board: Board, current_state, nn: int = 1000, ef: float = 2.):
     Args:
         board:  The game setup.
         current_state:  The current state of the game.
+        nn:     The number of MCTS iterations to run.
+        ef:     The exploration constant.
 
     Returns:    The action to be taken from the current state
 
     """
-    global num_nodes
-    global explore_faction
-    num_nodes = nn
-    explore_faction = ef
-
     bot_identity = board.current_player(current_state) # 1 or 2
     root_node = MCTSNode(parent=None, parent_action=None, action_list=board.legal_actions(current_state))
 
-    for _ in range(num_nodes):
+    for _ in range(nn):
         state = current_state
         node = root_node
         # Do MCTS - This is all you!
         # ...
 
         # Selection Step
-        while node.untried_actions == []:
+        while not node.untried:
             prev = node
             node.visits += 1
-            node, state = traverse_nodes(node, board, state, bot_identity)
-            if node.child_nodes == {} and prev == node:
+            node, state = traverse_nodes(node, board, state, bot_identity, ef)
+            if not node.child_list and prev == node:
                 break
 
         # Expansion Step
-        if node.untried_actions != []:
+        if node.untried:
             node, state = expand_leaf(node, board, state)
             node.visits += 1
-            node, state = traverse_nodes(node, board, state, bot_identity)
+            node, state = traverse_nodes(node, board, state, bot_identity, ef)
 
         # Simulation Step
-        state = rollout(board, state)
-        if is_win(board, state, bot_identity):
-            won = True
-        else:
-            won = False
+        won = board.random_playout(state) == bot_identity
 
         # Backpropogation Step
         backpropagate(node, won)
@@ -0,0 +1,146 @@
+/* The C core of fast_board.py: Board.next_state, legal_actions, is_ended and random_playout on the
+ * first 20 entries of a Board state (the 18 sub-board masks, then the two big-board masks; packed as
+ * native uint16 bytes for the playouts, so Python can pass them without a copy into C memory), with the
+ * constraint as a sub-board index 3 * R + C (-1 when unconstrained) and actions as 0..80 codes
+ * 9 * (3 * R + C) + 3 * r + c. Built into the _fast_board extension by build_fast_board.py. */
+
+#include <stdint.h>
+#include <string.h>
+
+static const uint16_t lines[8] = {0x007, 0x038, 0x1c0, 0x049, 0x092, 0x124, 0x111, 0x054};
+
+static uint8_t won[512];
+static uint8_t popcount[512];
+static int ready = 0;
+
+static void init_tables(void)
+{
+    for (int mask = 0; mask < 512; mask++) {
+        won[mask] = 0;
+        popcount[mask] = mask ? popcount[mask & (mask - 1)] + 1 : 0;
+        for (int i = 0; i < 8; i++)
+            if ((mask & lines[i]) == lines[i])
+                won[mask] = 1;
+    }
+    ready = 1;
+}
+
+int fb_next_state(uint16_t *m, int player, int code)
+{
+    int x = code / 9, cell = code % 9, i = 2 * x + player - 1;
+
+    if (!ready)
+        init_tables();
+    m[i] |= 1 << cell;
+    if (won[m[i]])
+        m[17 + player] |= 1 << x;
+    else if ((m[2 * x] | m[2 * x + 1]) == 0x1ff) {
+        m[18] |= 1 << x;
+        m[19] |= 1 << x;
+    }
+    return ((m[18] | m[19]) >> cell & 1) ? -1 : cell;
+}
+
+int fb_legal_codes(const uint16_t *m, int constraint, uint8_t *out)
+{
+    int finished = m[18] | m[19], n = 0;
+
+    for (int x = 0; x < 9; x++) {
+        if (constraint >= 0 && x != constraint)
+            continue;
+        if (finished >> x & 1)
+            continue;
+        int occupied = m[2 * x] | m[2 * x + 1];
+        for (int cell = 0; cell < 9; cell++)
+            if (!(occupied >> cell & 1))
+                out[n++] = 9 * x + cell;
+    }
+    return n;
+}
+
+int fb_is_ended(const uint16_t *m)
+{
+    if (!ready)
+        init_tables();
+    return won[m[18] & ~m[19]] || won[m[19] & ~m[18]] || (m[18] | m[19]) == 0x1ff;
+}
+
+static int nth_bit(int mask, int k)
+{
+    while (k--)
+        mask &= mask - 1;
+    return __builtin_ctz(mask);
+}
+
+int fb_random_playout(const char *state, int constraint, int player, uint64_t seed, uint8_t *trace)
+{
+    /* plays one game from state; returns the winner (1 or 2), or 0 for a draw */
+    uint16_t m[20];
+    int empty[9];
+    /* xorshift64*, seeded through one splitmix64 step so nearby seeds give unrelated games */
+    uint64_t r = seed + 0x9e3779b97f4a7c15ULL;
+    r = (r ^ (r >> 30)) * 0xbf58476d1ce4e5b9ULL;
+    r = (r ^ (r >> 27)) * 0x94d049bb133111ebULL;
+    r ^= r >> 31;
+    if (r == 0)
+        r = 1;
+
+    if (!ready)
+        init_tables();
+    if (trace)
+        memset(trace, 0xff, 81);    /* 255 marks the end of the moves played */
+    memcpy(m, state, sizeof(m));
+    for (int x = 0; x < 9; x++)
+        empty[x] = ~(m[2 * x] | m[2 * x + 1]) & 0x1ff;
+
+    for (int ply = 0;; ply++) {
+        if (won[m[18] & ~m[19]])
+            return 1;
+        if (won[m[19] & ~m[18]])
+            return 2;
+        int finished = m[18] | m[19];
+        if (finished == 0x1ff)
+            return 0;
+
+        /* count the legal moves, then take the k-th in code order */
+        int n = 0, x = constraint;
+        if (x >= 0)
+            n = popcount[empty[x]];
+        else
+            for (int b = 0; b < 9; b++)
+                if (!(finished >> b & 1))
+                    n += popcount[empty[b]];
+        if (n == 0)
+            return 0;   /* unreachable from a valid state: the required sub-board is never finished */
+
+        r ^= r >> 12;
+        r ^= r << 25;
+        r ^= r >> 27;
+        int k = (int)(((r * 0x2545f4914f6cdd1dULL) >> 32) * (uint64_t)n >> 32);
+
+        if (x < 0)
+            for (x = 0;; x++) {
+                if (finished >> x & 1)
+                    continue;
+                int count = popcount[empty[x]];
+                if (k < count)
+                    break;
+                k -= count;
+            }
+        int cell = nth_bit(empty[x], k);
+        if (trace)
+            trace[ply] = 9 * x + cell;
+
+        empty[x] &= ~(1 << cell);
+        constraint = fb_next_state(m, player, 9 * x + cell);
+        player = 3 - player;
+    }
+}
+
+void fb_random_playouts(const char *state, int constraint, int player, uint64_t seed, int n, int *winners)
+{
+    /* plays n games from state, counting draws in winners[0] and wins in winners[1] and winners[2] */
+    winners[0] = winners[1] = winners[2] = 0;
+    for (int i = 0; i < n; i++)
+        winners[fb_random_playout(state, constraint, player, seed + (uint64_t)i, NULL)]++;
+}
@@ -0,0 +1,81 @@
+import random
+import struct
+from p2_t3 import Board
+
+# An optional compiled backend for Board. The C core in fast_board.c implements next_state, legal_actions,
+# is_ended and complete random playouts on sub-board bitmasks; build_fast_board.py compiles it into the
+# _fast_board extension with cffi, and check_fast_board.py tests it against Board.
+#
+# FastBoard keeps the Board state tuples and (R, C, r, c) actions, so it is a drop-in replacement. It runs
+# playouts in C, where a whole game costs one call. next_state, legal_actions and is_ended stay the
+# pure-Python table-driven versions: copying a state tuple into C and the result back costs more than
+# those single steps do in Python. When the extension is missing, lib is None and make_board returns a
+# numba_rollout.NumbaBoard if Numba is installed, and a plain Board otherwise.
+
+try:
+    from _fast_board import ffi, lib
+except ImportError:
+    ffi = lib = None
+
+pack_masks = struct.Struct('20H').pack  # The 20 masks of a state as the uint16 bytes the C playouts read.
+
+
+def make_board():
+    """ Returns a FastBoard if the extension is built, a NumbaBoard if Numba is installed, and a Board otherwise.
+    A NumbaBoard's kernels are compiled, or loaded from the disk cache, here rather than in the first timed move.
+    """
+    if lib is not None:
+        return FastBoard()
+    import numba_rollout    # only on this path: importing Numba takes about a quarter of a second
+    if numba_rollout.jit is not None:
+        numba_rollout.warm_up()
+        return numba_rollout.NumbaBoard()
+    return Board()
+
+
+def c_constraint(state):
+    """ Returns the required sub-board of state as 3 * R + C, or -1 when there is none. """
+    return -1 if state[20] is None else 3 * state[20] + state[21]
+
+
+class FastBoard(Board):
+    """ A Board whose random playouts run in the _fast_board extension. """
+
+    def random_playout(self, state, rng=random):
+        """ Plays a random game out in C, seeded with 64 bits drawn from rng. Sources of randomness without
+        getrandbits get the pure-Python playout instead.
+        """
+        if not hasattr(rng, 'getrandbits'):
+            return Board.random_playout(self, state, rng)
+        return lib.fb_random_playout(pack_masks(*state[:20]), -1 if state[20] is None else 3 * state[20] + state[21],
+                                     state[22], rng.getrandbits(64), ffi.NULL)
+
+    def playout_wins(self, state, k: int, identity: int, rng=random):
+        """ Runs k random playouts from state in one C call and returns how many identity won. """
+        winners = ffi.new("int[3]")
+        lib.fb_random_playouts(pack_masks(*state[:20]), c_constraint(state), state[22], rng.getrandbits(64), k,
+                               winners)
+        return winners[identity]
+
+    def playout_plies(self, state, rng=random):
+        """ Plays a random game out in C like random_playout, also counting its moves for search_stats.
+
+        Returns:
+            winner: The winning player (1 or 2), or 0 for a draw
+            plies: The number of moves played
+
+        """
+        winner, trace = self.playout_trace(state, rng.getrandbits(64))
+        return winner, trace.index(255) if 255 in trace else len(trace)
+
+    def playout_trace(self, state, seed: int):
+        """ Plays the C playout from state with the given seed.
+
+        Returns:
+            winner: The winning player (1 or 2), or 0 for a draw
+            codes: 81 entries: the action codes of the moves played, in order, then 255s
+
+        """
+        trace = ffi.new("uint8_t[81]")
+        winner = lib.fb_random_playout(pack_masks(*state[:20]), c_constraint(state), state[22], seed, trace)
+        return winner, list(trace)
@@ -1,13 +1,15 @@
 
-from mcts_node import MCTSNode
-from p2_t3 import Board
+from mcts_node import MCTSNode, last_max_index
+from p2_t3 import Board, decode_action
 from random import choice
 from math import sqrt, log
+import opening_book
 
 num_nodes = 2000
 explore_faction = 2.
+book_path = None        # Opening book file (see build_book.py) consulted before searching; None disables it.
 
-def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int):
+def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int, explore: float|None = None):
     """ Traverses the tree until the end criterion are met.
     e.g. find the best expandable node (node with untried action) if it exist,
     or else a terminal node
@@ -17,6 +19,7 @@ def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int):
         board:      The game setup.
         state:      The state of the game.
         identity:   The bot's identity, either 1 or 2
+        explore:    The exploration constant; defaults to explore_faction.
 
     Returns:
         node: A node from which the next stage of the search can proceed.
@@ -25,31 +28,26 @@ def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int):
     """
 
     best_child = node
-    top_UCB = 0
-    avg_UCB = 0
-    top_heuristic = 0
     new_state = state
-
-    if (len(node.child_nodes) != 0):
-        # calculates average
-        for child in node.child_nodes:
-            UCB = ucb(node.child_nodes[child], False)
-            avg_UCB += UCB
-        
-        avg_UCB = avg_UCB / len(node.child_nodes)
-
-    # grabbing bounds
-    for child in node.child_nodes:
-        cur_child = node.child_nodes[child]
-        UCB = ucb(cur_child, False)
-        heuristic = 0.8 * avg_UCB + 0.2 * UCB
-        if heuristic >= top_heuristic:
-            top_heuristic = heuristic
-            best_child = cur_child
+    if explore is None:
+        explore = explore_faction
+
+    if node.child_list:
+        # scores every child once, then blends each with the average
+        UCBs = node.child_ucb_scores(explore)
+        if isinstance(UCBs, list):
+            avg_UCB = sum(UCBs) / len(UCBs)
+            heuristics = [0.8 * avg_UCB + 0.2 * UCB for UCB in UCBs]
+        else:
+            heuristics = 0.8 * UCBs.mean() + 0.2 * UCBs
+        best_child = node.child_list[last_max_index(heuristics)]
     
-    # setting best child and updating state
-    if best_child.parent_action != None:
-        new_state = board.next_state(state, best_child.parent_action)
+    # setting best child and updating state, from its cached state when it has one
+    if best_child is not node:
+        new_state = best_child.state
+        if new_state is None:
+            new_state = board.next_state(state, best_child.parent_action)
+            best_child.cache_state(new_state)
     return best_child, new_state
 
 def expand_leaf(node: MCTSNode, board: Board, state):
@@ -65,20 +63,19 @@ def expand_leaf(node: MCTSNode, board: Board, state):
         state: The state associated with that node
 
     """
-    if node.untried_actions:
-        # Select an untried action
-        action = node.untried_actions.pop()
-        
-        # Ensure the action is legal
-        if board.is_legal(state, action):
-            # Create a new child node
-            new_node = MCTSNode(parent=node, parent_action=action, action_list=board.legal_actions(board.next_state(state, action)))
-            node.child_nodes[action] = new_node
-            
-            # Update the current state based on the selected action
-            state = board.next_state(state, action)
-            
-            return new_node, state
+    if node.untried:
+        # Select an untried action (untried actions come from legal_codes, so it is legal)
+        code = node.pop_untried()
+        action = decode_action(code)
+
+        # Update the current state based on the selected action
+        state = board.next_state(state, action)
+
+        # Create a new child node
+        new_node = MCTSNode(parent=node, parent_action=action, untried=board.legal_codes(state))
+        node.add_child(action, new_node, code)
+
+        return new_node, state
 
     return node, state
 
@@ -116,29 +113,30 @@ def backpropagate(node: MCTSNode|None, won: bool):
     """
     # trace back through nodes and update values
     while node:
-        node.visits += 1
-        if won:
-            node.wins += 1
+        node.add_visits(1, won)
         node = node.parent
 
 
-def ucb(node: MCTSNode, is_opponent: bool):
+def ucb(node: MCTSNode, is_opponent: bool, ef: float|None = None):
     """ Calcualtes the UCB value for the given node from the perspective of the bot
 
     Args:
         node:   A node.
         is_opponent: A boolean indicating whether or not the last action was performed by the MCTS bot
+        ef:     The exploration constant; defaults to explore_faction.
     Returns:
         The value of the UCB function for the given node
     """
     if node.visits == 0:
         return 0
+    if ef is None:
+        ef = explore_faction
     if is_opponent:
         exploit = node.wins / node.visits
-        explore = explore_faction * sqrt(2 * log(node.parent.visits) / node.visits)
+        explore = ef * sqrt(2 * log(node.parent.visits) / node.visits)
     else:
         exploit = node.wins / node.visits
-        explore = explore_faction * sqrt(2 * log(node.visits) / node.visits)
+        explore = ef * sqrt(2 * log(node.visits) / node.visits)
     UCB = exploit + explore
     return UCB
 
@@ -154,11 +152,10 @@ def get_best_action(root_node: MCTSNode):
     best = float("-inf")
     best_action = None
     # go through root children and find best winrate 
-    for child in root_node.child_nodes:
-        cur_child = root_node.child_nodes[child]
+    for cur_child in root_node.child_list:
         if cur_child.wins / cur_child.visits >= best:
             best = cur_child.wins / cur_child.visits
-            best_action = child
+            best_action = cur_child.parent_action
     return best_action
 
 
@@ -168,50 +165,67 @@ def is_win(board: Board, state, identity_of_bot: int):
     assert outcome is not None, "is_win was called on a non-terminal state"
     return outcome[identity_of_bot] == 1
 
-def think(board: Board, current_state):
-    """ Performs MCTS by sampling games and calling the appropriate functions to construct the game tree.
+def search(board: Board, root_node: MCTSNode, current_state, iterations: int, explore: float|None = None):
+    """ Grows the tree below root_node by running the given number of MCTS iterations.
 
     Args:
-        board:  The game setup.
+        board:          The game setup.
+        root_node:      The root of the tree; its state is current_state.
         current_state:  The current state of the game.
-
-    Returns:    The action to be taken from the current state
+        iterations:     The number of iterations to run.
+        explore:        The exploration constant; defaults to explore_faction.
 
     """
     bot_identity = board.current_player(current_state) # 1 or 2
-    root_node = MCTSNode(parent=None, parent_action=None, action_list=board.legal_actions(current_state))
 
-    for _ in range(num_nodes):
+    for _ in range(iterations):
         state = current_state
         node = root_node
         # Do MCTS - This is all you!
         # ...
 
         # Selection Step
-        while node.untried_actions == []:
+        while not node.untried:
             prev = node
-            node.visits += 1
-            node, state = traverse_nodes(node, board, state, bot_identity)
-            if node.child_nodes == {} and prev == node:
+            node.add_visits(1)
+            node, state = traverse_nodes(node, board, state, bot_identity, explore)
+            if not node.child_list and prev == node:
                 break
 
         # Expansion Step
-        if node.untried_actions != []:
+        if node.untried:
             node, state = expand_leaf(node, board, state)
-            node.visits += 1
-            node, state = traverse_nodes(node, board, state, bot_identity)
+            node.add_visits(1)
+            node, state = traverse_nodes(node, board, state, bot_identity, explore)
 
         # Simulation Step
-        state = rollout(board, state)
-        if is_win(board, state, bot_identity):
-            won = True
-        else:
-            won = False
+        won = board.random_playout(state) == bot_identity
 
         # Backpropogation Step
         backpropagate(node, won)
 
 
+def think(board: Board, current_state, *, nn: int|None = None, ef: float|None = None):
+    """ Performs MCTS by sampling games and calling the appropriate functions to construct the game tree.
+
+    Args:
+        board:  The game setup.
+        current_state:  The current state of the game.
+        nn:     The number of MCTS iterations to run (keyword-only, as for mcts_vanilla.think); defaults to num_nodes.
+        ef:     The exploration constant (keyword-only); defaults to explore_faction.
+
+    Returns:    The action to be taken from the current state
+
+    """
+    if book_path is not None:
+        best_action = opening_book.probe(board, current_state, book_path)
+        if best_action is not None:
+            print(f"Action chosen: {best_action}")
+            return best_action
+
+    root_node = MCTSNode(parent=None, parent_action=None, untried=board.legal_codes(current_state))
+    search(board, root_node, current_state, num_nodes if nn is None else nn, ef)
+
     # Return an action, typically the most frequently used action (from the root) or the action with the best
     # estimated win rate.
     best_action = get_best_action(root_node)
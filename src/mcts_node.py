@@ -1,7 +1,27 @@
+from array import array
+from math import sqrt, log
+from types import MappingProxyType
+from p2_t3 import action_codes, encode_actions, decode_actions
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Nodes with at least this many children score them with NumPy (when installed) instead of a Python loop.
+NUMPY_MIN_CHILDREN = 16
+
+# Nodes that selection has passed through at least this many times keep their state the next time it is computed,
+# so later walks through them do not replay next_state. Every pass counts about twice (in select_leaf and in
+# backpropagate). In searches from the opening, 13-14% of the nodes cache a state (2000 and 20000 iterations),
+# which serves 69-81% of the traverse_nodes steps; the rarely revisited leaves, most of the tree, keep none.
+STATE_CACHE_VISITS = 4
+
+NO_CHILDREN = ()    # The child_list of every node without children, until add_child gives it a list of its own.
 
 
 class MCTSNode:
-    def __init__(self, parent=None, parent_action=None, action_list=[]):
+    def __init__(self, parent=None, parent_action=None, action_list=[], untried=None):
         """ Initializes the tree node for MCTS. The node stores links to other nodes in the tree (parent and child
         nodes), as well as keeps track of the number of wins and total simulations that have visited the node.
 
@@ -9,16 +29,128 @@ class MCTSNode:
             parent:         The parent node of this node.
             parent_action:  The action taken from the parent node that transitions the state to this node.
             action_list:    The list of legal actions to be considered at this node.
+            untried:        The legal actions as a mask of action codes (see Board.legal_codes), used instead of
+                            action_list when given.
 
         """
         self.parent = parent                    # Parent node to this node
         self.parent_action = parent_action      # The move that got us to this node - "None" for the root node.
+        self.state = None                       # This node's state, if cached (see STATE_CACHE_VISITS).
 
-        self.child_nodes = {}                   # Action -> MCTSNode dictionary of children
-        self.untried_actions = action_list      # Yet unexplored actions
+        self.children = None                    # Children by action code, in 81 slots allocated with the first.
+        self.untried = encode_actions(action_list) if untried is None else untried  # Codes of unexplored actions.
 
         self.wins = 0                           # Total wins of all paths through this node.
         self.visits = 0                         # Number of times this node has been visited.
+        self.stats = None                       # NodeStats shared with transposed nodes, if a table is in use.
+        self.key = None                         # Zobrist key of this node's state, if a table is in use.
+        self.proven = None                      # Exact result for the searching bot (1, 0 or -1), once solved.
+
+        self.slot = None                        # Index of this node in its parent's child arrays.
+        # Leaves, most of the tree, share an empty child_list and have no child arrays; add_child allocates them.
+        self.child_list = NO_CHILDREN           # Children in the order they were added.
+        self.child_wins = None                  # child_wins[i] and child_visits[i] mirror the wins and visits of
+        self.child_visits = None                # child_list[i], so selection can score every child in one pass.
+
+    @property
+    def child_nodes(self):
+        """ A read-only action -> child mapping, in the order the children were added. It is rebuilt from
+        child_list on every access, so hot loops should iterate child_list instead; add children with add_child.
+        """
+        return MappingProxyType({child.parent_action: child for child in self.child_list})
+
+    @property
+    def untried_actions(self):
+        """ The unexplored actions as a list, in legal_actions order. """
+        return decode_actions(self.untried)
+
+    @untried_actions.setter
+    def untried_actions(self, actions):
+        self.untried = encode_actions(actions)
+
+    def pop_untried(self):
+        """ Removes and returns the highest unexplored action code (the last action of untried_actions). """
+        code = self.untried.bit_length() - 1
+        self.untried ^= 1 << code
+        return code
+
+    def child(self, action):
+        """ Returns the child reached by action, or None. """
+        if self.children is None:
+            return None
+        return self.children[action_codes[action]]
+
+    def add_child(self, action, child, code=None):
+        """ Links child under this node as the result of action and gives it a slot in the child arrays.
+
+        Args:
+            action: The action leading from this node to child.
+            child:  The new child node.
+            code:   The action's code, if the caller has it.
+
+        """
+        if code is None:
+            code = action_codes[action]
+        if self.children is None:
+            self.children = [None] * 81
+            self.child_list = []
+            self.child_wins = array('d')
+            self.child_visits = array('d')
+        child.slot = len(self.child_list)
+        self.children[code] = child
+        self.child_list.append(child)
+        self.child_wins.append(child.wins)
+        self.child_visits.append(child.visits)
+
+    def add_visits(self, visits, wins=0):
+        """ Adds to this node's visit and win counts, keeping its parent's child arrays in step.
+
+        Args:
+            visits: The number of visits to add (negative to take back a virtual loss).
+            wins:   The number of wins to add.
+
+        """
+        self.visits += visits
+        self.wins += wins
+        if self.slot is not None:
+            self.parent.child_visits[self.slot] = self.visits
+            self.parent.child_wins[self.slot] = self.wins
+
+    def detach(self):
+        """ Unlinks this node from its parent so that it can become the root of a tree. """
+        self.parent = None
+        self.slot = None
+
+    def cache_state(self, state):
+        """ Keeps state as this node's state if the node has been visited often enough (see STATE_CACHE_VISITS). """
+        if self.visits >= STATE_CACHE_VISITS:
+            self.state = state
+
+    def child_ucb_scores(self, explore):
+        """ Scores every child, in child_list order, straight from the child arrays.
+
+        Each score is wins / visits + explore * sqrt(2 * log(visits) / visits), the formula the bots' ucb() uses,
+        or 0 for an unvisited child. Wide nodes are scored in a single vectorised NumPy step when it is available.
+
+        Args:
+            explore:    The exploration constant.
+
+        Returns:    A sequence of scores, one per child.
+
+        """
+        if not self.child_list:
+            return []
+        if np is not None and len(self.child_list) >= NUMPY_MIN_CHILDREN:
+            visits = np.frombuffer(self.child_visits)
+            wins = np.frombuffer(self.child_wins)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = wins / visits + explore * np.sqrt(2 * np.log(visits) / visits)
+            scores[visits == 0] = 0
+            return scores
+        return [
+            0 if n == 0 else w / n + explore * sqrt(2 * log(n) / n)
+            for w, n in zip(self.child_wins, self.child_visits)
+        ]
 
     def __repr__(self):
         """
@@ -43,3 +175,14 @@ class MCTSNode:
             for child in self.child_nodes.values():
                 string += child.tree_to_string(horizon - 1, indent + 1)
         return string
+
+
+def last_max_index(scores):
+    """ Returns the index of the last highest score, matching the `>=` scans the bots use to pick a child. """
+    if np is not None and isinstance(scores, np.ndarray):
+        return len(scores) - 1 - int(np.argmax(scores[::-1]))
+    best = 0
+    for i, score in enumerate(scores):
+        if score >= scores[best]:
+            best = i
+    return best
@@ -0,0 +1,213 @@
+import atexit
+import os
+import random
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from mcts_node import MCTSNode
+from p2_t3 import Board
+from batch_rollout import leaf_wins
+import mcts_vanilla
+import playout_policy
+
+# Parallel versions of mcts_vanilla.
+#
+# Root-parallel (think): every worker process grows its own tree from the current state with its own
+# seed, and the root children's statistics are summed before choosing a move.
+#
+# Tree-parallel (think_tree): one shared tree is walked by the main process, which keeps up to
+# `workers` playouts in flight. Each in-flight path carries a virtual loss so later selections spread
+# to other branches; backpropagate takes it back out when the result arrives. Only the main thread
+# touches the tree, so visit statistics stay consistent. Playouts run in worker threads on
+# free-threaded Python and in worker processes otherwise.
+#
+# Pools are created on first use and kept for the rest of the process, so their start-up cost is paid
+# once per match rather than once per move.
+#
+# On platforms that spawn rather than fork (Windows, macOS), the script that imports this module
+# must guard its top-level code with `if __name__ == "__main__":`.
+
+workers = os.cpu_count() or 1   # Number of worker processes (or threads for think_tree on free-threaded Python).
+virtual_loss = 3                # Visits without wins added along a path while its playout is in flight.
+
+# mcts_vanilla settings that root-parallel workers search with. They are sent along with every search, since
+# spawned workers start from the module defaults and never see changes the parent made to these globals.
+worker_settings = ('explore_faction', 'rollouts_per_leaf', 'rollout_policy', 'transposition_size',
+                   'transposition_symmetric')
+
+_pool = None
+_pool_workers = 0
+_thread_pool = None
+_thread_pool_workers = 0
+
+
+def free_threaded():
+    """ Returns True when running on a free-threaded (GIL disabled) Python. """
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def get_pool():
+    """ Returns the shared process pool, (re)creating it if the worker count has changed. """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def get_playout_pool():
+    """ Returns the pool used for tree-parallel playouts: threads when free-threaded, else the process pool. """
+    global _thread_pool, _thread_pool_workers
+    if not free_threaded():
+        return get_pool()
+    if _thread_pool is None or _thread_pool_workers != workers:
+        if _thread_pool is not None:
+            _thread_pool.shutdown()
+        _thread_pool = ThreadPoolExecutor(max_workers=workers)
+        _thread_pool_workers = workers
+    return _thread_pool
+
+
+def shutdown_pool():
+    """ Stops the shared pools, if any are running. """
+    global _pool, _pool_workers, _thread_pool, _thread_pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+        _pool_workers = 0
+    if _thread_pool is not None:
+        _thread_pool.shutdown()
+        _thread_pool = None
+        _thread_pool_workers = 0
+
+
+atexit.register(shutdown_pool)
+
+
+def search_root(board: Board, current_state, iterations: int, seed: int, settings: dict|None = None):
+    """ Builds one independent tree and reports its root children.
+
+    Args:
+        board:          The game setup.
+        current_state:  The current state of the game.
+        iterations:     The number of MCTS iterations to run.
+        seed:           The seed for this worker's random playouts.
+        settings:       Values for the mcts_vanilla globals named in worker_settings, as taken by the caller's
+                        process; the worker's own values are used when omitted.
+
+    Returns:    An action -> (wins, visits) dictionary for the root children.
+
+    """
+    if settings:
+        for name, value in settings.items():
+            setattr(mcts_vanilla, name, value)
+    random.seed(seed)
+    root_node = MCTSNode(parent=None, parent_action=None, action_list=board.legal_actions(current_state))
+    mcts_vanilla.search(board, root_node, current_state, iterations)
+    return {action: (child.wins, child.visits) for action, child in root_node.child_nodes.items()}
+
+
+def merge_roots(results):
+    """ Sums root-child statistics from several trees into a single root node.
+
+    Args:
+        results:    An iterable of action -> (wins, visits) dictionaries, as returned by search_root.
+
+    Returns:    A root node whose children carry the summed wins and visits.
+
+    """
+    root_node = MCTSNode(parent=None, parent_action=None, action_list=[])
+    for children in results:
+        for action, (wins, visits) in children.items():
+            child = root_node.child(action)
+            if child is None:
+                child = MCTSNode(parent=root_node, parent_action=action, action_list=[])
+                root_node.add_child(action, child)
+            child.add_visits(visits, wins)
+            root_node.add_visits(visits)
+    return root_node
+
+
+def think(board: Board, current_state):
+    """ Performs root-parallel MCTS across the shared worker pool.
+
+    Args:
+        board:  The game setup.
+        current_state:  The current state of the game.
+
+    Returns:    The action to be taken from the current state
+
+    """
+    pool = get_pool()
+    seeds = [random.getrandbits(32) for _ in range(workers)]
+    settings = {name: getattr(mcts_vanilla, name) for name in worker_settings}
+    futures = [
+        pool.submit(search_root, board, current_state, mcts_vanilla.num_nodes, seed, settings)
+        for seed in seeds
+    ]
+    root_node = merge_roots(future.result() for future in futures)
+
+    best_action = mcts_vanilla.get_best_action(root_node)
+
+    print(f"Action chosen: {best_action}")
+    return best_action
+
+
+def playout(board: Board, state, k: int, identity: int, seed: int, policy: str = 'random'):
+    """ Runs k playouts from state in a worker and returns how many identity won. As in mcts_vanilla.search, a
+    single playout follows the named playout_policy and several run as random playouts through leaf_wins.
+    """
+    rng = random.Random(seed)
+    if k == 1:
+        return int(playout_policy.playout(board, state, policy, rng) == identity)
+    return leaf_wins(board, state, k, identity, rng)
+
+
+def tree_search(board: Board, root_node: MCTSNode, current_state, iterations: int):
+    """ Grows a shared tree below root_node, keeping up to `workers` playouts running at once.
+
+    Args:
+        board:          The game setup.
+        root_node:      The root of the tree; its state is current_state.
+        current_state:  The current state of the game.
+        iterations:     The number of MCTS iterations to run.
+
+    """
+    bot_identity = board.current_player(current_state)
+    k = mcts_vanilla.rollouts_per_leaf
+    pool = get_playout_pool()
+    pending = {}
+    started = 0
+
+    while started < iterations or pending:
+        while started < iterations and len(pending) < workers:
+            node, state = mcts_vanilla.select_leaf(board, root_node, current_state, bot_identity)
+            mcts_vanilla.add_virtual_loss(node, virtual_loss)
+            future = pool.submit(playout, board, state, k, bot_identity, random.getrandbits(32),
+                                 mcts_vanilla.rollout_policy)
+            pending[future] = node
+            started += 1
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            mcts_vanilla.backpropagate(pending.pop(future), future.result(), k, virtual_loss)
+
+
+def think_tree(board: Board, current_state):
+    """ Performs tree-parallel MCTS with virtual loss, running mcts_vanilla.num_nodes iterations in total.
+
+    Args:
+        board:  The game setup.
+        current_state:  The current state of the game.
+
+    Returns:    The action to be taken from the current state
+
+    """
+    root_node = MCTSNode(parent=None, parent_action=None, action_list=board.legal_actions(current_state))
+    tree_search(board, root_node, current_state, mcts_vanilla.num_nodes)
+
+    best_action = mcts_vanilla.get_best_action(root_node)
+
+    print(f"Action chosen: {best_action}")
+    return best_action
@@ -0,0 +1,64 @@
+from mcts_node import MCTSNode
+from p2_t3 import Board
+import mcts_vanilla
+
+
+class TreeReuseBot:
+    """ An MCTS player that keeps its tree between moves.
+
+    After choosing a move the bot keeps only the subtree below that move. On its next turn it looks for the child
+    of that subtree matching the opponent's reply and continues searching from there, so the iterations already spent
+    on that position are not thrown away. Everything else is unlinked so it can be freed.
+
+    Trees are kept per player identity, so one instance can play both sides of a game. If the state does not
+    follow from the kept tree (a new game, or an unexpected reply), a fresh tree is started.
+    """
+
+    def __init__(self, mcts=mcts_vanilla):
+        """
+        Args:
+            mcts:   The MCTS module providing search and get_best_action, e.g. mcts_vanilla or mcts_modified.
+        """
+        self.mcts = mcts
+        self.trees = {}     # Bot identity -> (root node, state at that root)
+
+    def find_root(self, board: Board, current_state):
+        """ Returns the kept node for current_state as a detached root, or a new root if there is none.
+
+        Args:
+            board:          The game setup.
+            current_state:  The current state of the game.
+
+        Returns:    A root node whose state is current_state.
+
+        """
+        kept = self.trees.pop(board.current_player(current_state), None)
+        if kept is not None:
+            node, state = kept
+            for action, child in node.child_nodes.items():
+                if board.next_state(state, action) == current_state:
+                    child.detach()
+                    return child
+        return MCTSNode(parent=None, parent_action=None, action_list=board.legal_actions(current_state))
+
+    def think(self, board: Board, current_state):
+        """ Searches from the reused (or new) root and keeps the subtree below the chosen move.
+
+        Args:
+            board:  The game setup.
+            current_state:  The current state of the game.
+
+        Returns:    The action to be taken from the current state
+
+        """
+        root_node = self.find_root(board, current_state)
+        self.mcts.search(board, root_node, current_state, self.mcts.num_nodes)
+        best_action = self.mcts.get_best_action(root_node)
+
+        child = root_node.child_nodes.get(best_action)
+        if child is not None:
+            child.detach()
+            self.trees[board.current_player(current_state)] = (child, board.next_state(current_state, best_action))
+
+        print(f"Action chosen: {best_action}")
+        return best_action
@@ -1,13 +1,37 @@
 
-from mcts_node import MCTSNode
-from p2_t3 import Board
-from random import choice
+from mcts_node import MCTSNode, last_max_index
+from p2_t3 import Board, decode_action
+from batch_rollout import leaf_wins
+from transposition import TranspositionTable
+from search_stats import SearchStats, CountingRandom
+from random import choice, Random
 from math import sqrt, log
+from time import monotonic
+import opening_book
+import endgame
+import playout_policy
 
 num_nodes = 2000
 explore_faction = 2.
-
-def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int):
+rollouts_per_leaf = 1   # Playouts per expanded leaf; from batch_rollout.BATCH_MIN_PLAYOUTS on they run as one NumPy batch.
+rollout_policy = 'random'   # Playout policy for single playouts (see playout_policy.py), e.g. 'heavy'.
+transposition_size = 0  # Capacity of the per-player transposition tables; 0 disables them.
+transposition_symmetric = False # Whether symmetric states share transposition entries (keyed by Board.canonical).
+move_time_ms = None     # Wall-clock budget per move in milliseconds; None runs exactly num_nodes iterations.
+time_min_iterations = 100       # Iteration floor for time-budgeted moves.
+time_max_iterations = 1000000   # Iteration ceiling for time-budgeted moves.
+clock_check_interval = 16   # Iterations between clock reads in time-budgeted moves.
+book_path = None        # Opening book file (see build_book.py) consulted before searching; None disables it.
+solver_empty_cells = 0  # Positions with at most this many empty cells are solved exactly (see endgame.py); 0 disables.
+solver_max_nodes = 20000    # Positions an exact solve may search before giving up and leaving it to rollouts.
+profile_rate = 0.       # Fraction of think calls that collect SearchStats (see search_stats.py); 0 disables.
+
+last_stats = None       # SearchStats of the last profiled think call.
+_profile_rng = Random() # Picks the profiled calls without drawing from the random module games are seeded with.
+
+transposition_tables = {}   # Bot identity -> TranspositionTable, kept across think calls.
+
+def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int, explore: float|None = None):
     """ Traverses the tree until the end criterion are met.
     e.g. find the best expandable node (node with untried action) if it exist,
     or else a terminal node
@@ -17,6 +41,7 @@ def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int):
         board:      The game setup.
         state:      The state of the game.
         identity:   The bot's identity, either 1 or 2
+        explore:    The exploration constant; defaults to explore_faction.
 
     Returns:
         node: A node from which the next stage of the search can proceed.
@@ -27,47 +52,64 @@ def traverse_nodes(node: MCTSNode, board: Board, state, bot_identity: int):
     best_child = node
     top_UCB = 0
     new_state = state
+    if explore is None:
+        explore = explore_faction
 
-    # grabbing bounds
-    for child in node.child_nodes:
-        cur_child = node.child_nodes[child]
-        UCB = ucb(cur_child, False)
-        if UCB >= top_UCB:
-            top_UCB = UCB
-            best_child = cur_child
+    if node.child_list and node.child_list[0].stats is None:
+        # score every child at once from the node's child arrays, in compiled code on boards that offer it
+        if hasattr(board, 'best_ucb_index'):
+            best_child = node.child_list[board.best_ucb_index(node, explore)]
+        else:
+            best_child = node.child_list[last_max_index(node.child_ucb_scores(explore))]
+    else:
+        # grabbing bounds
+        for cur_child in node.child_list:
+            UCB = ucb(cur_child, False, explore)
+            if UCB >= top_UCB:
+                top_UCB = UCB
+                best_child = cur_child
     
-    # setting best child and updating state
-    if best_child.parent_action != None:
-        new_state = board.next_state(state, best_child.parent_action)
+    # setting best child and updating state, from its cached state when it has one
+    if best_child is not node:
+        new_state = best_child.state
+        if new_state is None:
+            new_state = board.next_state(state, best_child.parent_action)
+            best_child.cache_state(new_state)
     return best_child, new_state
 
-def expand_leaf(node: MCTSNode, board: Board, state):
+def expand_leaf(node: MCTSNode, board: Board, state, table: TranspositionTable|None = None):
     """ Adds a new leaf to the tree by creating a new child node for the given node (if it is non-terminal).
 
     Args:
         node:   The node for which a child will be added.
         board:  The game setup.
         state:  The state of the game.
+        table:  A transposition table; if given, the new node shares statistics with other nodes for the same state.
 
     Returns:
         node: The added child node
         state: The state associated with that node
 
     """
-    if node.untried_actions:
-        # Select an untried action
-        action = node.untried_actions.pop()
-        
-        # Ensure the action is legal
-        if board.is_legal(state, action):
-            # Create a new child node
-            new_node = MCTSNode(parent=node, parent_action=action, action_list=board.legal_actions(board.next_state(state, action)))
-            node.child_nodes[action] = new_node
-            
-            # Update the current state based on the selected action
+    if node.untried:
+        # Select an untried action (untried actions come from legal_codes, so it is legal)
+        code = node.pop_untried()
+        action = decode_action(code)
+
+        # Update the current state based on the selected action
+        if table is not None:
+            state, key = board.next_state_hashed(state, action, node.key)
+        else:
             state = board.next_state(state, action)
-            
-            return new_node, state
+
+        # Create a new child node
+        new_node = MCTSNode(parent=node, parent_action=action, untried=board.legal_codes(state))
+        node.add_child(action, new_node, code)
+        if table is not None:
+            new_node.key = key
+            new_node.stats = table.lookup(board.canonical(state)[0] if transposition_symmetric else key)
+
+        return new_node, state
 
     return node, state
 
@@ -95,39 +137,79 @@ def rollout(board: Board, state):
 
 
 
-def backpropagate(node: MCTSNode|None, won: bool):
+def backpropagate(node: MCTSNode|None, won: bool|int, visits: int = 1, virtual_loss: int = 0):
     """ Navigates the tree from a leaf node to the root, updating the win and visit count of each node along the path.
 
     Args:
         node:   A leaf node.
-        won:    An indicator of whether the bot won or lost the game.
+        won:    An indicator of whether the bot won or lost the game, or the number of wins when several
+                playouts were run from the leaf.
+        visits: The number of playouts run from the leaf.
+        virtual_loss:   The virtual loss added to this path by add_virtual_loss, which is taken back out.
 
     """
     # trace back through nodes and update values
     while node:
-        node.visits += 1
-        if won:
-            node.wins += 1
+        node.add_visits(visits - virtual_loss, won)
+        if node.stats is not None:
+            node.stats.visits += visits - virtual_loss
+            node.stats.wins += won
         node = node.parent
 
 
-def ucb(node: MCTSNode, is_opponent: bool):
+def add_virtual_loss(node: MCTSNode|None, amount: int):
+    """ Counts amount pending losses on every node from a leaf to the root, so that other searches sharing the tree
+    see a lower win rate along this path until backpropagate reverts it.
+
+    Args:
+        node:   A leaf node.
+        amount: The number of lost visits to add.
+
+    """
+    while node:
+        node.add_visits(amount)
+        if node.stats is not None:
+            node.stats.visits += amount
+        node = node.parent
+
+
+def add_selection_visit(node: MCTSNode):
+    """ Counts a selection pass through node. Selection visits are mirrored into the node's shared transposition
+    statistics, so both win rates ucb can use divide by visit counts kept the same way.
+
+    Args:
+        node:   A node on the path being selected.
+
+    """
+    node.add_visits(1)
+    if node.stats is not None:
+        node.stats.visits += 1
+
+
+def ucb(node: MCTSNode, is_opponent: bool, ef: float|None = None):
     """ Calcualtes the UCB value for the given node from the perspective of the bot
 
     Args:
         node:   A node.
         is_opponent: A boolean indicating whether or not the last action was performed by the MCTS bot
+        ef:     The exploration constant; defaults to explore_faction.
     Returns:
         The value of the UCB function for the given node
     """
     if node.visits == 0:
         return 0
-    if is_opponent:
-        exploit = node.wins / node.visits
-        explore = explore_faction * sqrt(2 * log(node.parent.visits) / node.visits)
+    if ef is None:
+        ef = explore_faction
+    # With a transposition table the node's state may be reached along several paths: the win rate comes from the
+    # shared statistics of the state, while exploration still uses this edge's own visit count.
+    if node.stats is not None and node.stats.visits > 0:
+        exploit = node.stats.wins / node.stats.visits
     else:
         exploit = node.wins / node.visits
-        explore = explore_faction * sqrt(2 * log(node.visits) / node.visits)
+    if is_opponent:
+        explore = ef * sqrt(2 * log(node.parent.visits) / node.visits)
+    else:
+        explore = ef * sqrt(2 * log(node.visits) / node.visits)
     UCB = exploit + explore
     return UCB
 
@@ -140,14 +222,19 @@ def get_best_action(root_node: MCTSNode):
         action: The best action from the root node
     
     """
+    if root_node.proven is not None:
+        # a solved root: play a move that achieves its value
+        for child in root_node.child_list:
+            if child.proven == root_node.proven:
+                return child.parent_action
+
     best = float("-inf")
     best_action = None
     # go through root children and find best winrate 
-    for child in root_node.child_nodes:
-        cur_child = root_node.child_nodes[child]
+    for cur_child in root_node.child_list:
         if cur_child.wins / cur_child.visits >= best:
             best = cur_child.wins / cur_child.visits
-            best_action = child
+            best_action = cur_child.parent_action
     return best_action
 
 
@@ -157,53 +244,240 @@ def is_win(board: Board, state, identity_of_bot: int):
     assert outcome is not None, "is_win was called on a non-terminal state"
     return outcome[identity_of_bot] == 1
 
-def think(board: Board, current_state):
-    """ Performs MCTS by sampling games and calling the appropriate functions to construct the game tree.
+def prove_leaf(board: Board, node: MCTSNode, state, bot_identity: int):
+    """ Solves a newly expanded leaf if it has ended or has few enough empty cells, and passes proven results up the
+    tree: a node is proven once one of its children proves a win for the player moving there, or once all of its
+    moves are expanded and proven. Proven nodes are not expanded further.
 
     Args:
-        board:  The game setup.
+        node:           The leaf node.
+        board:          The game setup.
+        state:          The state associated with node.
+        bot_identity:   The bot's identity, either 1 or 2
+
+    """
+    outcome = board.points_values(state)
+    if outcome is not None:
+        value = outcome[bot_identity]
+    elif endgame.empty_cells(board, state) <= solver_empty_cells:
+        value = endgame.solve(board, state, solver_max_nodes)
+        if value is None:
+            return
+        if board.current_player(state) != bot_identity:
+            value = -value
+    else:
+        return
+
+    node.proven = value
+    node.untried = 0
+    mover = board.previous_player(state)
+    node = node.parent
+    while node is not None and node.proven is None:
+        values = [child.proven for child in node.child_list]
+        best = 1 if mover == bot_identity else -1
+        if best in values:
+            node.proven = best
+        elif not node.untried and None not in values:
+            node.proven = max(values) if mover == bot_identity else min(values)
+        else:
+            return
+        node.untried = 0
+        mover = 3 - mover
+        node = node.parent
+
+
+def select_leaf(board: Board, root_node: MCTSNode, current_state, bot_identity: int, explore: float|None = None,
+                stats: SearchStats|None = None):
+    """ Runs the selection and expansion steps of one MCTS iteration.
+
+    Args:
+        board:          The game setup.
+        root_node:      The root of the tree; its state is current_state.
         current_state:  The current state of the game.
+        bot_identity:   The bot's identity, either 1 or 2
+        explore:        The exploration constant; defaults to explore_faction.
+        stats:          SearchStats to time the selection and expansion steps in, if profiling.
 
-    Returns:    The action to be taken from the current state
+    Returns:
+        node: The node to simulate from
+        state: The state associated with that node
+
+    """
+    state = current_state
+    node = root_node
+    table = transposition_tables.get(bot_identity)
+
+    # Selection Step
+    while not node.untried and node.proven is None:
+        prev = node
+        add_selection_visit(node)
+        node, state = traverse_nodes(node, board, state, bot_identity, explore)
+        if not node.child_list and prev == node:
+            break
+    if stats is not None:
+        stats.lap('selection')
+    if node.proven is not None:
+        add_selection_visit(node)
+        return node, state
+
+    # Expansion Step
+    if node.untried:
+        node, state = expand_leaf(node, board, state, table)
+        if solver_empty_cells:
+            prove_leaf(board, node, state, bot_identity)
+        add_selection_visit(node)
+        if node.proven is None:
+            node, state = traverse_nodes(node, board, state, bot_identity, explore)
+        if stats is not None:
+            stats.lap('expansion')
+
+    return node, state
+
+def search(board: Board, root_node: MCTSNode, current_state, iterations: int,
+           deadline: float|None = None, min_iterations: int = 0, explore: float|None = None,
+           stats: SearchStats|None = None):
+    """ Grows the tree below root_node by running the given number of MCTS iterations.
+
+    Args:
+        board:          The game setup.
+        root_node:      The root of the tree; its state is current_state.
+        current_state:  The current state of the game.
+        iterations:     The number of iterations to run, or the most to run when a deadline is given.
+        deadline:       A time.monotonic() value; once min_iterations have run, the search stops at the first clock
+                        check (every clock_check_interval iterations) past it.
+        min_iterations: The number of iterations to run regardless of the deadline.
+        explore:        The exploration constant; defaults to explore_faction.
+        stats:          SearchStats to record phase timings and playout lengths in, if profiling.
+
+    Returns:    The number of iterations run.
 
     """
     bot_identity = board.current_player(current_state) # 1 or 2
-    root_node = MCTSNode(parent=None, parent_action=None, action_list=board.legal_actions(current_state))
-
-    for _ in range(num_nodes):
-        state = current_state
-        node = root_node
-        # Do MCTS - This is all you!
-        # ...
-
-        # Selection Step
-        while node.untried_actions == []:
-            prev = node
-            node.visits += 1
-            node, state = traverse_nodes(node, board, state, bot_identity)
-            if node.child_nodes == {} and prev == node:
-                break
-
-        # Expansion Step
-        if node.untried_actions != []:
-            node, state = expand_leaf(node, board, state)
-            node.visits += 1
-            node, state = traverse_nodes(node, board, state, bot_identity)
+    if transposition_size and bot_identity not in transposition_tables:
+        transposition_tables[bot_identity] = TranspositionTable(transposition_size)
+    if bot_identity in transposition_tables and root_node.key is None:
+        root_node.key = board.zobrist(current_state)
+
+    for n in range(iterations):
+        if deadline is not None and n >= min_iterations and n % clock_check_interval == 0 and monotonic() >= deadline:
+            return n
+        if root_node.proven is not None:
+            return n
+
+        if stats is not None:
+            stats.start()
+
+        # Selection and Expansion Steps
+        node, state = select_leaf(board, root_node, current_state, bot_identity, explore, stats)
 
         # Simulation Step
-        state = rollout(board, state)
-        if is_win(board, state, bot_identity):
-            won = True
+        if node.proven is not None:
+            won = rollouts_per_leaf if node.proven == 1 else 0
+        elif rollouts_per_leaf > 1:
+            won = leaf_wins(board, state, rollouts_per_leaf, bot_identity)
+        elif stats is not None:
+            # compiled playouts report their own length; the pure-Python ones are counted through their rng
+            if rollout_policy == 'random' and hasattr(board, 'playout_plies'):
+                winner, plies = board.playout_plies(state)
+            else:
+                rng = CountingRandom()
+                winner = playout_policy.playout(board, state, rollout_policy, rng)
+                plies = rng.calls
+            won = winner == bot_identity
+            stats.add_rollout(plies)
         else:
-            won = False
+            won = playout_policy.playout(board, state, rollout_policy) == bot_identity
+        if stats is not None:
+            stats.lap('simulation')
 
         # Backpropogation Step
-        backpropagate(node, won)
+        backpropagate(node, won, rollouts_per_leaf)
+        if stats is not None:
+            stats.lap('backpropagation')
+
+    return iterations
 
 
+def think(board: Board, current_state, time_ms: float|None = None, min_iterations: int|None = None,
+          max_iterations: int|None = None, stats: SearchStats|None = None, *, nn: int|None = None,
+          ef: float|None = None):
+    """ Performs MCTS by sampling games and calling the appropriate functions to construct the game tree.
+
+    Args:
+        board:  The game setup.
+        current_state:  The current state of the game.
+        time_ms:        A wall-clock budget in milliseconds; the search stops once it is spent and returns the best
+                        action found so far. Defaults to move_time_ms (None: run num_nodes iterations).
+        min_iterations: The iteration floor for a time budget; defaults to time_min_iterations.
+        max_iterations: The iteration ceiling for a time budget; defaults to time_max_iterations.
+        stats:          SearchStats to profile the search into; a share profile_rate of calls without one
+                        are profiled anyway. Either way the stats of a profiled search are kept in last_stats.
+        nn:     The number of MCTS iterations to run without a time budget (keyword-only); defaults to num_nodes.
+        ef:     The exploration constant (keyword-only); defaults to explore_faction.
+
+    Returns:    The action to be taken from the current state
+
+    """
+    global last_stats
+    if stats is None and profile_rate and _profile_rng.random() < profile_rate:
+        stats = SearchStats()
+
+    if book_path is not None:
+        best_action = opening_book.probe(board, current_state, book_path)
+        if best_action is not None:
+            print(f"Action chosen: {best_action}")
+            return best_action
+
+    if solver_empty_cells and endgame.empty_cells(board, current_state) <= solver_empty_cells:
+        best_action, value = endgame.best_action(board, current_state, solver_max_nodes)
+        if best_action is not None:
+            print(f"Solved: {best_action} {'wins' if value == 1 else 'draws' if value == 0 else 'loses'}")
+            print(f"Action chosen: {best_action}")
+            return best_action
+
+    if time_ms is None:
+        time_ms = move_time_ms
+    root_node = MCTSNode(parent=None, parent_action=None, untried=board.legal_codes(current_state))
+
+    start = monotonic()
+    if time_ms is None:
+        iterations = search(board, root_node, current_state, num_nodes if nn is None else nn, explore=ef, stats=stats)
+    else:
+        if min_iterations is None:
+            min_iterations = time_min_iterations
+        if max_iterations is None:
+            max_iterations = time_max_iterations
+        iterations = search(board, root_node, current_state, max_iterations, start + time_ms / 1000, min_iterations, ef,
+                            stats)
+        print(f"Searched {iterations} iterations in {1000 * (monotonic() - start):.0f}ms of {time_ms}ms")
+
+    if stats is not None:
+        stats.iterations = iterations
+        stats.total_time = monotonic() - start
+        stats.measure_tree(root_node)
+        last_stats = stats
+        print(f"Search stats: {stats}")
+
     # Return an action, typically the most frequently used action (from the root) or the action with the best
     # estimated win rate.
     best_action = get_best_action(root_node)
     
     print(f"Action chosen: {best_action}")
     return best_action
+
+
+def think_with_stats(board: Board, current_state, **kwargs):
+    """ Runs think with profiling on.
+
+    Args:
+        board:          The game setup.
+        current_state:  The current state of the game.
+        kwargs:         Further think arguments.
+
+    Returns:
+        action: The action to be taken from the current state
+        stats: The SearchStats of the search (empty if the book or the endgame solver chose the move)
+
+    """
+    stats = SearchStats()
+    return think(board, current_state, stats=stats, **kwargs), stats
@@ -0,0 +1,184 @@
+import random
+from math import sqrt, log
+from p2_t3 import Board, won_boards
+from mcts_node import last_max_index
+import search_stats
+
+# Optional Numba-compiled kernels: a complete random playout on a NumPy copy of a state's 20 bitmasks (the
+# first 20 entries of a Board state tuple), a batch of such playouts, and UCB child selection over the child
+# arrays of an MCTSNode. The kernels are compiled with cache=True, so the machine code is written to
+# __pycache__ the first time and later processes, such as tournament workers, load it instead of compiling.
+# Without Numba (or NumPy), jit is None and NumbaBoard and best_ucb_index fall back to the pure-Python code.
+# NumbaBoard carries the kernels into a search: mcts_vanilla.traverse_nodes picks children with a board's
+# best_ucb_index when it has one, so bots on other boards never import Numba. fast_board.make_board returns
+# a warmed-up NumbaBoard when the (faster still) C backend is not built.
+
+try:
+    import numpy as np
+    import numba
+except ImportError:
+    np = numba = None
+
+jit = None if numba is None else numba.njit(cache=True)
+
+# Nodes with at least this many children pick one with the compiled UCB kernel rather than child_ucb_scores
+# (the kernel is already ~2x faster at 3 children and ~6x at 81).
+NUMBA_MIN_CHILDREN = 2
+
+
+def _next_rng(r):
+    """ One xorshift32 step on a 32-bit state held in an int. """
+    r ^= (r << 13) & 0xffffffff
+    r ^= r >> 17
+    r ^= (r << 5) & 0xffffffff
+    return r
+
+
+def _playout(masks, constraint, player, r, won, popcount):
+    """ Plays one random game from a (20,) mask array; returns the winner (0 for a draw), the rng state and the
+    number of moves played.
+    """
+    m = masks.copy()
+    empty = np.empty(9, np.int64)
+    for x in range(9):
+        empty[x] = ~(m[2 * x] | m[2 * x + 1]) & 0x1ff
+
+    plies = 0
+    while True:
+        p1, p2 = m[18], m[19]
+        if won[p1 & ~p2]:
+            return 1, r, plies
+        if won[p2 & ~p1]:
+            return 2, r, plies
+        finished = p1 | p2
+        if finished == 0x1ff:
+            return 0, r, plies
+
+        # count the legal moves, then take the k-th in code order
+        n = 0
+        if constraint >= 0:
+            n = popcount[empty[constraint]]
+        else:
+            for b in range(9):
+                if not finished >> b & 1:
+                    n += popcount[empty[b]]
+        r = _next_rng(r)
+        k = (r * n) >> 32
+
+        x = constraint
+        if x < 0:
+            x = 0
+            while True:
+                if not finished >> x & 1:
+                    if k < popcount[empty[x]]:
+                        break
+                    k -= popcount[empty[x]]
+                x += 1
+        cells = empty[x]
+        for _ in range(k):
+            cells &= cells - 1
+        bit = cells & -cells
+        cell = popcount[bit - 1]
+
+        i = 2 * x + player - 1
+        m[i] |= bit
+        empty[x] &= ~bit
+        if won[m[i]]:
+            m[17 + player] |= 1 << x
+        elif empty[x] == 0:
+            m[18] |= 1 << x
+            m[19] |= 1 << x
+
+        constraint = -1 if (m[18] | m[19]) >> cell & 1 else cell
+        player = 3 - player
+        plies += 1
+
+
+def _playouts(masks, constraint, player, seed, n, won, popcount):
+    """ Plays n random games from a (20,) mask array; returns an array of draw, player 1 and player 2 counts. """
+    winners = np.zeros(3, np.int64)
+    r = seed
+    for _ in range(n):
+        winner, r, _ = _playout(masks, constraint, player, r, won, popcount)
+        winners[winner] += 1
+    return winners
+
+
+def _best_ucb(wins, visits, explore):
+    """ Returns the index of the last child with the highest UCB score (0 for unvisited children). """
+    best, top = 0, -1.
+    for i in range(visits.shape[0]):
+        n = visits[i]
+        score = 0. if n == 0 else wins[i] / n + explore * sqrt(2 * log(n) / n)
+        if score >= top:
+            best, top = i, score
+    return best
+
+
+if jit is not None:
+    _next_rng = jit(_next_rng)
+    _playout = jit(_playout)
+    _playouts = jit(_playouts)
+    _best_ucb = jit(_best_ucb)
+    _won = np.array(won_boards, dtype=np.bool_)
+    _popcount = np.array([bin(mask).count('1') for mask in range(512)], dtype=np.int64)
+
+
+def state_array(state):
+    """ Returns the 20 bitmasks of a Board state tuple as an int64 array. """
+    return np.array(state[:20], dtype=np.int64)
+
+
+def warm_up():
+    """ Compiles the kernels, or loads them from the on-disk cache, ahead of the first search. """
+    if jit is not None:
+        NumbaBoard().playout_wins(Board().starting_state(), 1, 1)
+        _best_ucb(np.zeros(1), np.zeros(1), 1.)
+
+
+def best_ucb_index(node, explore: float):
+    """ Returns the index in node.child_list of the child with the highest UCB score, matching
+    last_max_index(node.child_ucb_scores(explore)).
+    """
+    if jit is not None and len(node.child_list) >= NUMBA_MIN_CHILDREN:
+        return _best_ucb(np.frombuffer(node.child_wins), np.frombuffer(node.child_visits), explore)
+    return last_max_index(node.child_ucb_scores(explore))
+
+
+class NumbaBoard(Board):
+    """ A Board whose random playouts run in the Numba kernels (or in Python, without Numba). """
+
+    def random_playout(self, state, rng=random):
+        """ Plays a random game out, seeded with 32 bits drawn from rng. Sources of randomness without
+        getrandbits get the pure-Python playout instead.
+        """
+        if jit is None or not hasattr(rng, 'getrandbits'):
+            return Board.random_playout(self, state, rng)
+        return _playout(state_array(state), -1 if state[20] is None else 3 * state[20] + state[21], state[22],
+                        rng.getrandbits(32) or 1, _won, _popcount)[0]
+
+    def playout_plies(self, state, rng=random):
+        """ Plays a random game out like random_playout, also counting its moves for search_stats.
+
+        Returns:
+            winner: The winning player (1 or 2), or 0 for a draw
+            plies: The number of moves played
+
+        """
+        if jit is None:
+            rng = search_stats.CountingRandom(rng)
+            return Board.random_playout(self, state, rng), rng.calls
+        winner, _, plies = _playout(state_array(state), -1 if state[20] is None else 3 * state[20] + state[21],
+                                    state[22], rng.getrandbits(32) or 1, _won, _popcount)
+        return winner, plies
+
+    def best_ucb_index(self, node, explore: float):
+        """ Returns the index in node.child_list of the child with the highest UCB score (see best_ucb_index). """
+        return best_ucb_index(node, explore)
+
+    def playout_wins(self, state, k: int, identity: int, rng=random):
+        """ Runs k random playouts from state in one kernel call and returns how many identity won. """
+        if jit is None:
+            return sum(Board.random_playout(self, state, rng) == identity for _ in range(k))
+        return int(_playouts(state_array(state), -1 if state[20] is None else 3 * state[20] + state[21], state[22],
+                             rng.getrandbits(32) or 1, k, _won, _popcount)[identity])
@@ -0,0 +1,91 @@
+import mmap
+import struct
+from p2_t3 import Board, decode_action, inverse_symmetries
+
+# An opening book: the move to play in each early position, precomputed offline (see build_book.py).
+#
+# Positions are stored up to symmetry: a position is looked up by the key of its canonical image (see
+# Board.canonical), and the book holds the move for that image, which is mapped back through the
+# inverse symmetry to get the move for the position actually on the board.
+#
+# File layout: an 8-byte header (magic, number of plies covered) followed by 9-byte records of
+# (uint64 canonical key, uint8 action code), little endian and sorted by key. Books are memory-mapped
+# and searched in place, so opening one costs nothing however large it is.
+
+MAGIC = b'UTBK'
+HEADER = struct.Struct('<4sI')
+RECORD = struct.Struct('<QB')
+
+
+def stones(state):
+    """ Returns the number of moves played to reach a state. """
+    return sum(bin(mask).count('1') for mask in state[:18])
+
+
+def write_book(path: str, entries: dict, plies: int):
+    """ Writes a canonical key -> action code dictionary as a book file covering the given number of plies. """
+    with open(path, 'wb') as book_file:
+        book_file.write(HEADER.pack(MAGIC, plies))
+        for key in sorted(entries):
+            book_file.write(RECORD.pack(key, entries[key]))
+
+
+class OpeningBook:
+    """ A memory-mapped book file. """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as book_file:
+            magic, self.plies = HEADER.unpack(book_file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError("%s is not an opening book" % path)
+            book_file.seek(0, 2)
+            self.size = (book_file.tell() - HEADER.size) // RECORD.size
+            self.data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+    def __len__(self):
+        return self.size
+
+    def find(self, key: int):
+        """ Returns the action code stored for a canonical key, or None, by binary search over the records. """
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key, code = RECORD.unpack_from(self.data, HEADER.size + mid * RECORD.size)
+            if mid_key == key:
+                return code
+            if mid_key < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def probe(self, board: Board, state):
+        """ Returns the book move for a state, or None when the state is not in the book.
+
+        Args:
+            board:  The game setup.
+            state:  The current state of the game, as a tuple.
+
+        Returns:    An (R, C, r, c) action, or None
+
+        """
+        if stones(state) >= self.plies:
+            return None
+        key, sym = board.canonical(state)
+        code = self.find(key)
+        if code is None:
+            return None
+        return board.transform(decode_action(code), inverse_symmetries[sym])
+
+
+_books = {}     # Path -> OpeningBook, so each file is mapped once per process.
+
+
+def probe(board: Board, state, path: str):
+    """ Looks a state up in the book at path (opened on first use); returns the book move or None. """
+    book = _books.get(path)
+    if book is None:
+        book = _books[path] = OpeningBook(path)
+    if hasattr(board, 'to_tuple'):
+        board, state = Board(), board.to_tuple(state)
+    return book.probe(board, state)
@@ -1,4 +1,5 @@
 import sys
+import random
 from timeit import default_timer as time
 import p2_t3
 import mcts_vanilla
@@ -7,6 +8,7 @@ import exp_mcts_vanilla
 import exp_mcts_modified
 import random_bot
 import rollout_bot
+from results import append_result
 
 players = dict(
     random_bot=random_bot.think,
@@ -17,6 +19,9 @@ players = dict(
     exp_mcts_modified=exp_mcts_modified.think,
 )
 
+# Every game is appended to this JSON Lines file as it finishes (see results.py); round i is seeded with i.
+results_path = 'p2_exp.jsonl'
+
 board = p2_t3.Board()
 state0 = board.starting_state()
 
@@ -33,23 +38,43 @@ if p2 not in players:
     print("p2 not in "+players.keys().join(","))
     exit(1)
 
+if len(sys.argv) > 5:
+    results_path = sys.argv[5]
+
 player1 = players[p1]
 player2 = players[p2]
 
+
+def player_config(name: str):
+    """ Returns the (num_nodes, explore_faction) the named player searches with, or (None, None) for non-MCTS bots. """
+    if name == 'exp_mcts_vanilla':
+        return int(sys.argv[3]), float(sys.argv[4])
+    if name == 'exp_mcts_modified':
+        return players[name].__defaults__[:2]
+    if name in ('mcts_vanilla', 'mcts_modified'):
+        module = mcts_vanilla if name == 'mcts_vanilla' else mcts_modified
+        return module.num_nodes, module.explore_faction
+    return None, None
+
+
 rounds = 100
 wins = {'draw':0, 1:0, 2:0}
 
 start = time()  # To log how much time the simulation takes.
 for i in range(rounds):
 
+    random.seed(i)
     state = state0
     last_action = None
     current_player = player1
+    move_times = []
     while not board.is_ended(state):
+        move_start = time()
         if current_player == exp_mcts_vanilla.think or current_player == exp_mcts_vanilla.think:
             last_action = current_player(board, state, int(sys.argv[3]), float(sys.argv[4]))
         else:
             last_action = current_player(board, state)
+        move_times.append(time() - move_start)
         state = board.next_state(state, last_action)
         current_player = player1 if current_player == player2 else player2
     final_score = board.points_values(state)
@@ -59,6 +84,13 @@ for i in range(rounds):
     elif final_score[2] == 1:
         winner = 2
     wins[winner] = wins.get(winner, 0) + 1
+    configs = {'1': player_config(p1), '2': player_config(p2)}
+    append_result(results_path, dict(
+        seed=i, p1=p1, p2=p2,
+        num_nodes={player: config[0] for player, config in configs.items()},
+        explore_faction={player: config[1] for player, config in configs.items()},
+        winner=winner, moves=len(move_times), move_times=move_times,
+    ))
 print("Final win counts:", dict(wins))
 print("")
 
@@ -2,6 +2,9 @@ import sys
 import p2_t3
 import mcts_vanilla
 import mcts_modified
+import mcts_parallel
+import mcts_reuse
+import tree_store
 import random_bot
 import rollout_bot
 
@@ -22,34 +25,45 @@ players = dict(
     rollout_bot=rollout_bot.think,
     mcts_vanilla=mcts_vanilla.think,
     mcts_modified=mcts_modified.think,
+    mcts_parallel=mcts_parallel.think,
+    mcts_tree_parallel=mcts_parallel.think_tree,
+    mcts_vanilla_reuse=mcts_reuse.TreeReuseBot(mcts_vanilla).think,
+    mcts_modified_reuse=mcts_reuse.TreeReuseBot(mcts_modified).think,
+    mcts_compact=tree_store.think,
 )
 
 board = p2_t3.Board()
 state0 = board.starting_state()
 
-if len(sys.argv) != 3:
-    print("Need two player arguments")
-    exit(1)
-
-p1 = sys.argv[1]
-if p1 not in players:
-    print("p1 not in "+", ".join(players.keys()))
-    exit(1)
-p2 = sys.argv[2]
-if p2 not in players:
-    print("p2 not in "+", ".join(players.keys()))
-    exit(1)
-
-player1 = players[p1]
-player2 = players[p2]
-state = state0
-last_action = None
-current_player = player1
-while not board.is_ended(state):
-    print(board.display(state, last_action))
-    print("Player "+str(board.current_player(state)))
-    last_action = current_player(board, state)
-    state = board.next_state(state, last_action)
-    current_player = player1 if current_player == player2 else player2
-print("Finished!")
-print(board.points_values(state))
+
+def main():
+    if len(sys.argv) != 3:
+        print("Need two player arguments")
+        exit(1)
+
+    p1 = sys.argv[1]
+    if p1 not in players:
+        print("p1 not in "+", ".join(players.keys()))
+        exit(1)
+    p2 = sys.argv[2]
+    if p2 not in players:
+        print("p2 not in "+", ".join(players.keys()))
+        exit(1)
+
+    player1 = players[p1]
+    player2 = players[p2]
+    state = state0
+    last_action = None
+    current_player = player1
+    while not board.is_ended(state):
+        print(board.display(state, last_action))
+        print("Player "+str(board.current_player(state)))
+        last_action = current_player(board, state)
+        state = board.next_state(state, last_action)
+        current_player = player1 if current_player == player2 else player2
+    print("Finished!")
+    print(board.points_values(state))
+
+
+if __name__ == "__main__":
+    main()
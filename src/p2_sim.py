@@ -1,67 +1,110 @@
 import sys
+import random
 from timeit import default_timer as time
-import p2_t3
+import fast_board
 import mcts_vanilla
 import mcts_modified
+import mcts_parallel
+import mcts_reuse
+import tree_store
 import random_bot
 import rollout_bot
+from results import append_result
 
 players = dict(
     random_bot=random_bot.think,
     rollout_bot=rollout_bot.think,
     mcts_vanilla=mcts_vanilla.think,
     mcts_modified=mcts_modified.think,
+    mcts_parallel=mcts_parallel.think,
+    mcts_tree_parallel=mcts_parallel.think_tree,
+    mcts_vanilla_reuse=mcts_reuse.TreeReuseBot(mcts_vanilla).think,
+    mcts_modified_reuse=mcts_reuse.TreeReuseBot(mcts_modified).think,
+    mcts_compact=tree_store.think,
 )
 
-board = p2_t3.Board()
+# Modules whose num_nodes and explore_faction configure each MCTS player, for the game records.
+mcts_modules = dict(
+    mcts_vanilla=mcts_vanilla,
+    mcts_modified=mcts_modified,
+    mcts_parallel=mcts_vanilla,
+    mcts_tree_parallel=mcts_vanilla,
+    mcts_vanilla_reuse=mcts_vanilla,
+    mcts_modified_reuse=mcts_modified,
+    mcts_compact=mcts_vanilla,
+)
+
+# Every game is appended to this JSON Lines file as it finishes (see results.py); round i is seeded with i.
+results_path = 'p2_sim.jsonl'
+
+board = fast_board.make_board()  # Board, with C playouts when the _fast_board extension is built.
 state0 = board.starting_state()
 
-if len(sys.argv) != 3:
-    print("Need two player arguments")
-    exit(1)
 
-p1 = sys.argv[1]
-if p1 not in players:
-    print("p1 not in "+players.keys().join(","))
-    exit(1)
-p2 = sys.argv[2]
-if p2 not in players:
-    print("p2 not in "+players.keys().join(","))
-    exit(1)
+def main():
+    if len(sys.argv) not in (3, 4):
+        print("Need two player arguments (and optionally a results file)")
+        exit(1)
+
+    p1 = sys.argv[1]
+    if p1 not in players:
+        print("p1 not in "+players.keys().join(","))
+        exit(1)
+    p2 = sys.argv[2]
+    if p2 not in players:
+        print("p2 not in "+players.keys().join(","))
+        exit(1)
+
+    out = sys.argv[3] if len(sys.argv) == 4 else results_path
 
-player1 = players[p1]
-player2 = players[p2]
+    player1 = players[p1]
+    player2 = players[p2]
 
-rounds = 100
-wins = {'draw':0, 1:0, 2:0}
+    rounds = 100
+    wins = {'draw':0, 1:0, 2:0}
 
-start = time()  # To log how much time the simulation takes.
-for i in range(rounds):
+    start = time()  # To log how much time the simulation takes.
+    for i in range(rounds):
+
+        print("")
+        print("Round %d, fight!" % i)
+
+        random.seed(i)
+        state = state0
+        last_action = None
+        current_player = player1
+        move_times = []
+        while not board.is_ended(state):
+            move_start = time()
+            last_action = current_player(board, state)
+            move_times.append(time() - move_start)
+            state = board.next_state(state, last_action)
+            current_player = player1 if current_player == player2 else player2
+        print("Finished!")
+        print()
+        final_score = board.points_values(state)
+        winner = 'draw'
+        if final_score[1] == 1:
+            winner = 1
+        elif final_score[2] == 1:
+            winner = 2
+        print("The %s bot wins this round! (%s)" % (winner, str(final_score)))
+        wins[winner] = wins.get(winner, 0) + 1
+        modules = {'1': mcts_modules.get(p1), '2': mcts_modules.get(p2)}
+        append_result(out, dict(
+            seed=i, p1=p1, p2=p2,
+            num_nodes={player: module and module.num_nodes for player, module in modules.items()},
+            explore_faction={player: module and module.explore_faction for player, module in modules.items()},
+            winner=winner, moves=len(move_times), move_times=move_times,
+        ))
 
     print("")
-    print("Round %d, fight!" % i)
-
-    state = state0
-    last_action = None
-    current_player = player1
-    while not board.is_ended(state):
-        last_action = current_player(board, state)
-        state = board.next_state(state, last_action)
-        current_player = player1 if current_player == player2 else player2
-    print("Finished!")
-    print()
-    final_score = board.points_values(state)
-    winner = 'draw'
-    if final_score[1] == 1:
-        winner = 1
-    elif final_score[2] == 1:
-        winner = 2
-    print("The %s bot wins this round! (%s)" % (winner, str(final_score)))
-    wins[winner] = wins.get(winner, 0) + 1
-
-print("")
-print("Final win counts:", dict(wins))
-
-# Also output the time elapsed.
-end = time()
-print(end - start, ' seconds')
+    print("Final win counts:", dict(wins))
+
+    # Also output the time elapsed.
+    end = time()
+    print(end - start, ' seconds')
+
+
+if __name__ == "__main__":
+    main()
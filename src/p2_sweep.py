@@ -0,0 +1,173 @@
+import argparse
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from timeit import default_timer as time
+from p2_tournament import parse_player, run_games
+from results import append_result
+
+# Sweeps MCTS parameters (num_nodes and explore_faction) by playing each configuration against a fixed
+# opponent. Configurations are passed to the bots as think arguments ("mcts_vanilla:500:1.4"), so no
+# module globals are changed and every worker can play any configuration. Candidates take turns as
+# player 1 and player 2, and game i of a stage uses the same seed for every candidate.
+#
+#   python p2_sweep.py --bots mcts_vanilla --nodes 250 500 1000 --explore 0.5 1 2 --rounds 20
+#   python p2_sweep.py --random 16 --nodes 100 2000 --explore 0.1 3 --halving --rounds 8
+#
+# A grid search plays every combination of --bots, --nodes and --explore; --random N instead draws N
+# configurations uniformly from the ranges the --nodes and --explore values span. With --halving, each
+# stage keeps the better half of the candidates and doubles the rounds, until one is left.
+# A candidate's score is (wins + draws / 2) / games.
+
+
+def candidates_grid(bots, nodes, explores):
+    """ Returns a spec for every combination of bot, node budget and exploration constant. """
+    return ['%s:%d:%r' % (bot, nn, ef) for bot in bots for nn in nodes for ef in explores]
+
+
+def candidates_random(bots, nodes, explores, n: int, rng: random.Random):
+    """ Returns n specs drawn uniformly from the ranges spanned by nodes and explores. """
+    return [
+        '%s:%d:%r' % (rng.choice(bots), rng.randint(min(nodes), max(nodes)),
+                      round(rng.uniform(min(explores), max(explores)), 3))
+        for _ in range(n)
+    ]
+
+
+def evaluate(candidates, opponent: str, rounds: int, seed: int, workers: int, pool=None, out=None):
+    """ Plays every candidate against the opponent.
+
+    Args:
+        candidates: The candidate player specs.
+        opponent:   The opponent's player spec.
+        rounds:     The number of games per candidate.
+        seed:       The seed of game 0; game i uses seed + i.
+        workers:    The number of worker processes; 0 plays serially.
+        pool:       A running process pool to play on.
+        out:        A JSON Lines file each game's record is appended to, if given.
+
+    Returns:    A candidate -> {'games', 'wins', 'losses', 'draws', 'score', 'move_time'} dictionary.
+
+    """
+    games = []
+    for candidate in candidates:
+        for i in range(rounds):
+            if i % 2 == 0:
+                games.append((candidate, opponent, seed + i))
+            else:
+                games.append((opponent, candidate, seed + i))
+
+    tally = {candidate: {'games': 0, 'wins': 0, 'losses': 0, 'draws': 0, 'time': 0., 'moves': 0}
+             for candidate in candidates}
+    for result in run_games(games, workers, pool):
+        if out:
+            append_result(out, result)
+        side = 1 if result['seed'] % 2 == seed % 2 else 2
+        entry = tally[result['p%d' % side]]
+        entry['games'] += 1
+        if result['winner'] == 'draw':
+            entry['draws'] += 1
+        elif result['winner'] == side:
+            entry['wins'] += 1
+        else:
+            entry['losses'] += 1
+        own_moves = result['move_times'][side - 1::2]
+        entry['time'] += sum(own_moves)
+        entry['moves'] += len(own_moves)
+
+    for entry in tally.values():
+        entry['score'] = (entry['wins'] + entry['draws'] / 2) / entry['games'] if entry['games'] else 0.
+        entry['move_time'] = entry.pop('time') / entry['moves'] if entry['moves'] else 0.
+        del entry['moves']
+    return tally
+
+
+def format_table(tally, title: str = ""):
+    """ Returns the result of evaluate as a text table, best score first. """
+    lines = [title] if title else []
+    lines.append("%-32s %6s %5s %5s %5s %6s %9s" % ("candidate", "games", "won", "lost", "draw", "score", "s/move"))
+    for candidate, entry in sorted(tally.items(), key=lambda item: -item[1]['score']):
+        lines.append("%-32s %6d %5d %5d %5d %6.3f %9.4f" % (
+            candidate, entry['games'], entry['wins'], entry['losses'], entry['draws'],
+            entry['score'], entry['move_time']))
+    return '\n'.join(lines)
+
+
+def sweep(candidates, opponent: str, rounds: int, seed: int, workers: int, halving: bool = False, out=None):
+    """ Evaluates the candidates, optionally by successive halving.
+
+    Args:
+        candidates: The candidate player specs.
+        opponent:   The opponent's player spec.
+        rounds:     The number of games per candidate (in the first stage, with halving).
+        seed:       The seed of the first game.
+        workers:    The number of worker processes; 0 plays serially.
+        halving:    Whether to keep the better half of the candidates after each stage.
+        out:        A JSON Lines file each game's record is appended to, if given.
+
+    Returns:    A list of (stage title, evaluate result) pairs, one per stage. The best candidate is the top scorer
+                of the last stage.
+
+    """
+    pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+    stages = []
+    try:
+        while True:
+            tally = evaluate(candidates, opponent, rounds, seed, workers, pool, out)
+            stages.append(("Stage %d: %d candidates, %d rounds each" % (len(stages) + 1, len(candidates), rounds),
+                           tally))
+            if not halving or len(candidates) <= 1:
+                return stages
+            ranked = sorted(candidates, key=lambda candidate: -tally[candidate]['score'])
+            candidates = ranked[:(len(ranked) + 1) // 2]
+            if len(candidates) == 1:
+                return stages   # the last stage already picked the winner; replaying it alone would decide nothing
+            seed += rounds
+            rounds *= 2
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweeps MCTS num_nodes and explore_faction against an opponent.")
+    parser.add_argument('--bots', nargs='+', default=['mcts_vanilla'], choices=['mcts_vanilla', 'mcts_modified'])
+    parser.add_argument('--nodes', nargs='+', type=int, default=[1000])
+    parser.add_argument('--explore', nargs='+', type=float, default=[2.])
+    parser.add_argument('--random', type=int, metavar='N', help="draw N random configurations instead of the grid")
+    parser.add_argument('--halving', action='store_true', help="successive halving: keep the top half each stage")
+    parser.add_argument('--opponent', default='mcts_vanilla')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes; 0 plays serially in this process")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="JSON Lines file to append each game's record to")
+    parser.add_argument('--summary', help="text file to write the final table to")
+    args = parser.parse_args()
+
+    try:
+        parse_player(args.opponent)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.random:
+        candidates = candidates_random(args.bots, args.nodes, args.explore, args.random, random.Random(args.seed))
+    else:
+        candidates = candidates_grid(args.bots, args.nodes, args.explore)
+
+    start = time()  # To log how much time the sweep takes.
+    stages = sweep(candidates, args.opponent, args.rounds, args.seed, args.workers, args.halving, args.out)
+    tables = [format_table(tally, title) for title, tally in stages]
+    best = max(stages[-1][1].items(), key=lambda item: item[1]['score'])[0]
+    tables.append("Best candidate: %s" % best)
+    print('\n\n'.join(tables))
+    if args.summary:
+        with open(args.summary, 'w') as summary_file:
+            summary_file.write('\n\n'.join(tables) + '\n')
+
+    print("")
+    print(time() - start, ' seconds')
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import random
+
 num_players = 2
 
 positions = dict(
@@ -30,6 +32,43 @@ inv_positions = dict(
     (v, P) for P, v in positions.items()
 )
 
+# Actions as integers 0..80: 27 * R + 9 * C + 3 * r + c, i.e. 9 * (sub-board index) + (cell index).
+# Codes sort in the same order as the (R, C, r, c) tuples, which is the order legal_actions returns.
+code_actions = [
+    (R, C, r, c)
+    for R in range(3)
+    for C in range(3)
+    for r in range(3)
+    for c in range(3)
+]
+
+action_codes = dict(
+    (action, code) for code, action in enumerate(code_actions)
+)
+
+
+def encode_action(action):
+    """ Returns the 0..80 code of an (R, C, r, c) action. """
+    return action_codes[action]
+
+
+def decode_action(code):
+    """ Returns the (R, C, r, c) action for a 0..80 code. """
+    return code_actions[code]
+
+
+def encode_actions(actions):
+    """ Returns the 81-bit mask with the code of each of actions set. """
+    mask = 0
+    for action in actions:
+        mask |= 1 << action_codes[action]
+    return mask
+
+
+def decode_actions(mask):
+    """ Returns the actions whose codes are set in an 81-bit mask, in code order (the order of legal_actions). """
+    return [code_actions[code] for code in range(mask.bit_length()) if mask >> code & 1]
+
 class Board(object):
     wins = [
         positions[(r, 0)] | positions[(r, 1)] | positions[(r, 2)]
@@ -195,7 +234,7 @@ class Board(object):
         updated_board = state[board_index + player_index]
 
         full = (state[board_index] | state[board_index + 1] == 0x1ff)
-        if any(updated_board & w == w for w in self.wins):
+        if won_boards[updated_board]:
             state[18 + player_index] |= positions[(R, C)]
         elif full:
             state[18] |= positions[(R, C)]
@@ -240,27 +279,177 @@ class Board(object):
 
     def legal_actions(self, state):
         R, C = state[20], state[21]
-        Rset, Cset = (R,), (C,)
-        if R is None:
-            Rset, Cset = range(3), range(3)
-
-        occupied = [
-            state[2 * x] | state[2 * x + 1] for x in range(9)
-        ]
         finished = state[18] | state[19]
 
-        actions = [
-            (R, C, r, c)
-            for R in Rset
-            for C in Cset
-            for r in range(3)
-            for c in range(3)
-            if not occupied[3 * R + C] & positions[(r, c)]
-            and not finished & positions[(R, C)]
-        ]
+        if R is not None:
+            x = 3 * R + C
+            if finished & (1 << x):
+                return []
+            return list(board_actions[x][state[2 * x] | state[2 * x + 1]])
+
+        actions = []
+        for x in range(9):
+            if not finished & (1 << x):
+                actions.extend(board_actions[x][state[2 * x] | state[2 * x + 1]])
 
         return actions
 
+    def legal_codes(self, state):
+        """ Returns the legal actions as an 81-bit mask of their codes (see encode_actions). """
+        R, C = state[20], state[21]
+        finished = state[18] | state[19]
+
+        if R is not None:
+            x = 3 * R + C
+            if finished & (1 << x):
+                return 0
+            return board_code_masks[x][state[2 * x] | state[2 * x + 1]]
+
+        mask = 0
+        for x in range(9):
+            if not finished & (1 << x):
+                mask |= board_code_masks[x][state[2 * x] | state[2 * x + 1]]
+
+        return mask
+
+    def random_playout(self, state, rng=random):
+        """ Plays uniformly random moves from state until the game ends, without building intermediate states.
+
+        Args:
+            state:  The state to play out from.
+            rng:    Source of randomness; anything with a choice method, such as the random module or a
+                    random.Random instance.
+
+        Returns:    The winning player (1 or 2), or 0 for a draw.
+
+        """
+        boards = list(state[:18])
+        occupied = [boards[2 * x] | boards[2 * x + 1] for x in range(9)]
+        p1, p2 = state[18], state[19]
+        player_index = state[22] - 1
+        x = None if state[20] is None else 3 * state[20] + state[21]
+        choice = rng.choice
+
+        while True:
+            if won_boards[p1 & ~p2]:
+                return 1
+            if won_boards[p2 & ~p1]:
+                return 2
+            finished = p1 | p2
+            if finished == 0x1ff:
+                return 0
+
+            if x is None:
+                moves = []
+                for b in range(9):
+                    if not finished >> b & 1:
+                        moves.extend(board_codes[b][occupied[b]])
+                x, cell = divmod(choice(moves), 9)
+            else:
+                cell = choice(empty_indices[occupied[x]])
+
+            bit = 1 << cell
+            i = 2 * x + player_index
+            boards[i] |= bit
+            occupied[x] |= bit
+            if won_boards[boards[i]]:
+                if player_index:
+                    p2 |= 1 << x
+                else:
+                    p1 |= 1 << x
+            elif occupied[x] == 0x1ff:
+                p1 |= 1 << x
+                p2 |= 1 << x
+
+            player_index ^= 1
+            x = None if (p1 | p2) >> cell & 1 else cell
+
+    def zobrist(self, state):
+        """ Computes the 64-bit Zobrist key of state from scratch.
+
+        Keys only depend on the position, so equal states get equal keys on every backend and in every process.
+        Use next_state_hashed to keep a key up to date move by move.
+        """
+        key = zobrist_player[state[22]]
+        for i in range(20):
+            key ^= zobrist_masks[i][state[i]]
+        if state[20] is None:
+            return key ^ zobrist_constraint[9]
+        return key ^ zobrist_constraint[3 * state[20] + state[21]]
+
+    def next_state_hashed(self, state, action, key):
+        """ Like next_state, but also returns the Zobrist key of the new state.
+
+        Args:
+            state:  The current state.
+            action: The action to apply.
+            key:    The Zobrist key of state.
+
+        Returns:
+            state: The next state
+            key: Its Zobrist key, updated by XOR for the placed piece, any change in sub-board ownership, the
+                 constraint and the player to move
+
+        """
+        R, C, r, c = action
+        x = 3 * R + C
+        new_state = self.next_state(state, action)
+
+        key ^= zobrist_bits[2 * x + state[22] - 1][3 * r + c] ^ zobrist_player[2]
+        if new_state[18] != state[18]:
+            key ^= zobrist_bits[18][x]
+        if new_state[19] != state[19]:
+            key ^= zobrist_bits[19][x]
+        key ^= zobrist_constraint[9 if state[20] is None else 3 * state[20] + state[21]]
+        key ^= zobrist_constraint[9 if new_state[20] is None else 3 * r + c]
+
+        return new_state, key
+
+    def transform(self, action, sym):
+        """ Applies symmetry sym (0..7, see symmetry_cells) to an (R, C, r, c) action. """
+        return code_actions[symmetry_codes[sym][action_codes[action]]]
+
+    def transform_state(self, state, sym):
+        """ Applies symmetry sym to a state: the inner boards move to their images on the outer board and
+        the cells of each inner board are permuted the same way.
+        """
+        masks = symmetry_masks[sym]
+        cells = symmetry_cells[sym]
+        transformed = [0] * 18 + [masks[state[18]], masks[state[19]], None, None, state[22]]
+        for x in range(9):
+            y = 2 * cells[x]
+            transformed[y] = masks[state[2 * x]]
+            transformed[y + 1] = masks[state[2 * x + 1]]
+        if state[20] is not None:
+            transformed[20], transformed[21] = divmod(cells[3 * state[20] + state[21]], 3)
+        return tuple(transformed)
+
+    def canonical(self, state):
+        """ Finds the canonical image of state: of its 8 symmetric images, the one with the smallest Zobrist key.
+
+        The keys of the images are combined straight from the lookup tables, without building the images,
+        so symmetric states can share transposition, book and cache entries cheaply.
+
+        Returns:
+            key: The Zobrist key of the canonical image
+            sym: The symmetry that maps state to its canonical image (the lowest one, if several do)
+
+        """
+        base = zobrist_player[state[22]]
+        constraint = None if state[20] is None else 3 * state[20] + state[21]
+        occupied = [(i, mask) for i, mask in enumerate(state[:20]) if mask]
+
+        best_key, best_sym = None, 0
+        for sym in range(8):
+            masks = symmetry_masks[sym]
+            slots = symmetry_slots[sym]
+            key = base ^ zobrist_constraint[9 if constraint is None else symmetry_cells[sym][constraint]]
+            for i, mask in occupied:
+                key ^= zobrist_masks[slots[i]][masks[mask]]
+            if best_key is None or key < best_key:
+                best_key, best_sym = key, sym
+        return best_key, best_sym
+
     def previous_player(self, state):
         return 3 - state[-1]
 
@@ -271,24 +460,15 @@ class Board(object):
         p1 = state[18] & ~state[19]
         p2 = state[19] & ~state[18]
 
-        if any(w & p1 == w for w in self.wins):
-            return True
-        if any(w & p2 == w for w in self.wins):
-            return True
-        if state[18] | state[19] == 0x1ff:
-            return True
-
-        return False
+        return won_boards[p1] or won_boards[p2] or state[18] | state[19] == 0x1ff
 
     def win_values(self, state):
-        if not self.is_ended(state):
-            return
         p1 = state[18] & ~state[19]
         p2 = state[19] & ~state[18]
 
-        if any(w & p1 == w for w in self.wins):
+        if won_boards[p1]:
             return {1: 1, 2: 0}
-        if any(w & p2 == w for w in self.wins):
+        if won_boards[p2]:
             return {1: 0, 2: 1}
         if state[18] | state[19] == 0x1ff:
             return {1: 0.5, 2: 0.5}
@@ -308,14 +488,12 @@ class Board(object):
         return ret
         
     def points_values(self, state):
-        if not self.is_ended(state):
-            return
         p1 = state[18] & ~state[19]
         p2 = state[19] & ~state[18]
 
-        if any(w & p1 == w for w in self.wins):
+        if won_boards[p1]:
             return {1: 1, 2: -1}
-        if any(w & p2 == w for w in self.wins):
+        if won_boards[p2]:
             return {1: -1, 2: 1}
         if state[18] | state[19] == 0x1ff:
             return {1: 0, 2: 0}
@@ -326,3 +504,303 @@ class Board(object):
         if value == 0.5:
             return "Draw."
         return "Winner: Player {0}.".format(winner)
+
+
+# Lookup tables indexed by a 9-bit sub-board bitmask, so the hot paths above
+# never have to scan Board.wins or rebuild action lists.
+
+# won_boards[mask] is True when mask contains a complete line.
+won_boards = [
+    any(mask & w == w for w in Board.wins)
+    for mask in range(512)
+]
+
+# empty_cells[occupied] lists the (r, c) cells not set in occupied.
+empty_cells = [
+    tuple(
+        (r, c)
+        for r in range(3)
+        for c in range(3)
+        if not occupied & positions[(r, c)]
+    )
+    for occupied in range(512)
+]
+
+# empty_indices[occupied] lists the cell indices 3 * r + c not set in occupied.
+empty_indices = [
+    tuple(3 * r + c for r, c in cells)
+    for cells in empty_cells
+]
+
+# board_codes[x][occupied] lists 9 * x + 3 * r + c for each empty cell of
+# sub-board x, so random_playout can pick a board and a cell with one choice.
+board_codes = [
+    [tuple(9 * x + i for i in indices) for indices in empty_indices]
+    for x in range(9)
+]
+
+# board_code_masks[x][occupied] is the 81-bit mask of the codes of the empty
+# cells of sub-board x, for legal_codes.
+board_code_masks = [
+    [(~occupied & 0x1ff) << (9 * x) for occupied in range(512)]
+    for x in range(9)
+]
+
+# board_actions[3 * R + C][occupied] lists the actions available in the
+# sub-board (R, C) when its occupied cells are given by occupied.
+board_actions = [
+    [tuple((R, C, r, c) for r, c in cells) for cells in empty_cells]
+    for R in range(3)
+    for C in range(3)
+]
+
+
+# Zobrist keys, drawn from a fixed seed so keys are stable across runs and processes.
+# zobrist_bits[i][b] is the key for bit b of state[i] (the 18 sub-board masks,
+# then the two big-board masks), zobrist_constraint[3 * r + c] is the key for
+# the required sub-board (index 9 when unconstrained) and zobrist_player[p] is
+# the key for player p to move.
+_zobrist_rng = random.Random(2014)
+zobrist_bits = [[_zobrist_rng.getrandbits(64) for b in range(9)] for i in range(20)]
+zobrist_constraint = [_zobrist_rng.getrandbits(64) for i in range(10)]
+zobrist_player = [0, 0, _zobrist_rng.getrandbits(64)]
+
+# zobrist_masks[i][mask] is the XOR of the keys of every bit of mask in state[i].
+zobrist_masks = [[0] * 512 for i in range(20)]
+for i in range(20):
+    for mask in range(1, 512):
+        low = mask & -mask
+        zobrist_masks[i][mask] = zobrist_masks[i][mask ^ low] ^ zobrist_bits[i][low.bit_length() - 1]
+
+
+# The 8 symmetries of the square, applied to the outer board and every inner board together: the 4
+# rotations, then the 4 reflections, each as a map of a (row, column) cell. symmetry_cells[sym][3 * r + c]
+# is the index of the cell (r, c) moves to, symmetry_masks[sym][mask] is a 9-bit mask with its cells
+# moved, symmetry_slots[sym][i] is the index state[i] moves to and symmetry_codes[sym][code] is the
+# action code an action moves to. inverse_symmetries[sym] undoes sym.
+_symmetry_maps = [
+    lambda r, c: (r, c),
+    lambda r, c: (c, 2 - r),
+    lambda r, c: (2 - r, 2 - c),
+    lambda r, c: (2 - c, r),
+    lambda r, c: (r, 2 - c),
+    lambda r, c: (2 - r, c),
+    lambda r, c: (c, r),
+    lambda r, c: (2 - c, 2 - r),
+]
+inverse_symmetries = [0, 3, 2, 1, 4, 5, 6, 7]
+
+symmetry_cells = [
+    [3 * R + C for R, C in (f(r, c) for r in range(3) for c in range(3))]
+    for f in _symmetry_maps
+]
+
+symmetry_masks = [
+    [sum(1 << cells[i] for i in range(9) if mask >> i & 1) for mask in range(512)]
+    for cells in symmetry_cells
+]
+
+symmetry_slots = [
+    [2 * cells[i // 2] + i % 2 for i in range(18)] + [18, 19]
+    for cells in symmetry_cells
+]
+
+symmetry_codes = [
+    [9 * cells[code // 9] + cells[code % 9] for code in range(81)]
+    for cells in symmetry_cells
+]
+
+
+class PackedBoard(Board):
+    """ A Board whose states are single Python ints rather than 23-tuples.
+
+    Bit layout, from least significant:
+        0..161      18 bits per sub-board (3 * R + C): player 1's 9 cells then player 2's 9 cells
+        162..170    big-board bitmask for player 1 (state[18] of the tuple form)
+        171..179    big-board bitmask for player 2 (state[19] of the tuple form)
+        180..183    required sub-board as 3 * R + C, or 9 when unconstrained
+        184         player to move minus one
+
+    Actions are the same (R, C, r, c) tuples used by Board. to_tuple and from_tuple convert between the two
+    state formats, and display/pack_state/unpack_state go through them so existing callers keep working.
+    """
+
+    P1_BOARDS = 162
+    P2_BOARDS = 171
+    CONSTRAINT = 180
+    PLAYER = 184
+    FREE = 9
+
+    def from_tuple(self, state):
+        packed = 0
+        for i in range(20):
+            packed |= state[i] << (9 * i)
+        if state[20] is None:
+            packed |= self.FREE << self.CONSTRAINT
+        else:
+            packed |= (3 * state[20] + state[21]) << self.CONSTRAINT
+        packed |= (state[22] - 1) << self.PLAYER
+        return packed
+
+    def to_tuple(self, packed):
+        state = [(packed >> (9 * i)) & 0x1ff for i in range(20)]
+        constraint = (packed >> self.CONSTRAINT) & 0xf
+        if constraint == self.FREE:
+            state.extend((None, None))
+        else:
+            state.extend(divmod(constraint, 3))
+        state.append((packed >> self.PLAYER) + 1)
+        return tuple(state)
+
+    def starting_state(self):
+        return self.FREE << self.CONSTRAINT
+
+    def display(self, state, action, _unicode=True):
+        return Board.display(self, self.to_tuple(state), action, _unicode)
+
+    def pack_state(self, data):
+        return self.from_tuple(Board.pack_state(self, data))
+
+    def unpack_state(self, state):
+        return Board.unpack_state(self, self.to_tuple(state))
+
+    def next_state(self, state, action):
+        R, C, r, c = action
+        x = 3 * R + C
+        player_index = state >> self.PLAYER
+        cell = positions[(r, c)]
+
+        sub = state >> (18 * x)
+        updated_board = (sub >> (9 * player_index) | cell) & 0x1ff
+        state |= cell << (18 * x + 9 * player_index)
+
+        if won_boards[updated_board]:
+            state |= 1 << (self.P1_BOARDS + 9 * player_index + x)
+        elif (sub | sub >> 9 | cell) & 0x1ff == 0x1ff:
+            state |= 0x201 << (self.P1_BOARDS + x)
+
+        big = state >> self.P1_BOARDS
+        constraint = 3 * r + c
+        if (big | big >> 9) & cell:
+            constraint = self.FREE
+
+        state &= (1 << self.CONSTRAINT) - 1
+        return state | (constraint << self.CONSTRAINT) | ((1 - player_index) << self.PLAYER)
+
+    def is_legal(self, state, action):
+        R, C, r, c = action
+
+        # Is action out of bounds?
+        if (R, C) not in positions:
+            return False
+        if (r, c) not in positions:
+            return False
+
+        x = 3 * R + C
+
+        # Is the square within the sub-board already taken?
+        occupied = ((state >> (18 * x)) | (state >> (18 * x + 9))) & 0x1ff
+        if positions[(r, c)] & occupied:
+            return False
+
+        # Is this particular board won already?
+        finished = ((state >> self.P1_BOARDS) | (state >> self.P2_BOARDS)) & 0x1ff
+        if finished & (1 << x):
+            return False
+
+        # Otherwise, we must play in the proper sub-board, if any.
+        constraint = (state >> self.CONSTRAINT) & 0xf
+        return constraint == self.FREE or constraint == x
+
+    def legal_actions(self, state):
+        constraint = (state >> self.CONSTRAINT) & 0xf
+        finished = ((state >> self.P1_BOARDS) | (state >> self.P2_BOARDS)) & 0x1ff
+
+        if constraint != self.FREE:
+            if finished & (1 << constraint):
+                return []
+            shift = 18 * constraint
+            return list(board_actions[constraint][((state >> shift) | (state >> (shift + 9))) & 0x1ff])
+
+        actions = []
+        for x in range(9):
+            if not finished & (1 << x):
+                shift = 18 * x
+                actions.extend(board_actions[x][((state >> shift) | (state >> (shift + 9))) & 0x1ff])
+
+        return actions
+
+    def legal_codes(self, state):
+        constraint = (state >> self.CONSTRAINT) & 0xf
+        finished = ((state >> self.P1_BOARDS) | (state >> self.P2_BOARDS)) & 0x1ff
+
+        if constraint != self.FREE:
+            if finished & (1 << constraint):
+                return 0
+            shift = 18 * constraint
+            return board_code_masks[constraint][((state >> shift) | (state >> (shift + 9))) & 0x1ff]
+
+        mask = 0
+        for x in range(9):
+            if not finished & (1 << x):
+                shift = 18 * x
+                mask |= board_code_masks[x][((state >> shift) | (state >> (shift + 9))) & 0x1ff]
+
+        return mask
+
+    def random_playout(self, state, rng=random):
+        return Board.random_playout(self, self.to_tuple(state), rng)
+
+    def zobrist(self, state):
+        return Board.zobrist(self, self.to_tuple(state))
+
+    def canonical(self, state):
+        return Board.canonical(self, self.to_tuple(state))
+
+    def transform_state(self, state, sym):
+        return self.from_tuple(Board.transform_state(self, self.to_tuple(state), sym))
+
+    def next_state_hashed(self, state, action, key):
+        R, C, r, c = action
+        x = 3 * R + C
+        new_state = self.next_state(state, action)
+
+        key ^= zobrist_bits[2 * x + (state >> self.PLAYER)][3 * r + c] ^ zobrist_player[2]
+        changed = (state ^ new_state) >> self.P1_BOARDS
+        if changed & 0x1ff:
+            key ^= zobrist_bits[18][x]
+        if (changed >> 9) & 0x1ff:
+            key ^= zobrist_bits[19][x]
+        key ^= zobrist_constraint[(state >> self.CONSTRAINT) & 0xf]
+        key ^= zobrist_constraint[(new_state >> self.CONSTRAINT) & 0xf]
+
+        return new_state, key
+
+    def previous_player(self, state):
+        return 2 - (state >> self.PLAYER)
+
+    def current_player(self, state):
+        return (state >> self.PLAYER) + 1
+
+    def is_ended(self, state):
+        p1 = (state >> self.P1_BOARDS) & 0x1ff
+        p2 = (state >> self.P2_BOARDS) & 0x1ff
+
+        return won_boards[p1 & ~p2] or won_boards[p2 & ~p1] or p1 | p2 == 0x1ff
+
+    def win_values(self, state):
+        return Board.win_values(self, self._big_board(state))
+
+    def owned_boxes(self, state):
+        return Board.owned_boxes(self, self._big_board(state))
+
+    def points_values(self, state):
+        return Board.points_values(self, self._big_board(state))
+
+    def _big_board(self, state):
+        # Only indices 18 and 19 are read by the Board methods that take this,
+        # so a short tuple is enough to reuse them.
+        return (None,) * 18 + (
+            (state >> self.P1_BOARDS) & 0x1ff,
+            (state >> self.P2_BOARDS) & 0x1ff,
+        )
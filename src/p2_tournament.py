@@ -0,0 +1,199 @@
+import argparse
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from timeit import default_timer as time
+import fast_board
+from results import append_result
+import mcts_vanilla
+import mcts_modified
+import exp_mcts_vanilla
+import exp_mcts_modified
+import mcts_reuse
+import tree_store
+import random_bot
+import rollout_bot
+
+# Plays bot-vs-bot games across a process pool. Every game gets its own seed (base seed + game number)
+# and seeds the random module before the first move, so a game's result only depends on its seed and
+# the totals match a serial run (--workers 0) of the same seeds. Results are printed as games finish.
+#
+#   python p2_tournament.py mcts_vanilla rollout_bot --rounds 100 --workers 8 --seed 0
+#
+# A player can carry extra arguments for its think function after colons, e.g. exp_mcts_vanilla:500:2.
+# or mcts_vanilla:500:1.4 (num_nodes, then explore_faction).
+# With --out, every game is also appended to a JSON Lines results file (see results.py) as it finishes.
+# (Bots that keep state across searches, such as transposition tables or time budgets, are only
+# reproducible if that state is turned off.)
+# Games use fast_board.make_board(), whose C playouts draw their seeds from the random module, so results
+# also depend on whether the _fast_board extension is built.
+
+players = dict(
+    random_bot=random_bot.think,
+    rollout_bot=rollout_bot.think,
+    mcts_vanilla=mcts_vanilla.think,
+    mcts_modified=mcts_modified.think,
+    exp_mcts_vanilla=exp_mcts_vanilla.think,
+    exp_mcts_modified=exp_mcts_modified.think,
+    mcts_vanilla_reuse=mcts_reuse.TreeReuseBot(mcts_vanilla).think,
+    mcts_modified_reuse=mcts_reuse.TreeReuseBot(mcts_modified).think,
+    mcts_compact=tree_store.think,
+)
+
+# Modules whose num_nodes and explore_faction configure each MCTS player when its spec has no arguments.
+mcts_modules = dict(
+    mcts_vanilla=mcts_vanilla,
+    mcts_modified=mcts_modified,
+    mcts_vanilla_reuse=mcts_vanilla,
+    mcts_modified_reuse=mcts_modified,
+    mcts_compact=mcts_vanilla,
+)
+
+board = fast_board.make_board()  # Board, with C playouts when the _fast_board extension is built.
+
+
+def parse_player(spec: str):
+    """ Splits a player spec like "exp_mcts_vanilla:500:2." into its name and extra think arguments.
+
+    Args:
+        spec:   The player name, optionally followed by colon-separated numeric arguments.
+
+    Returns:
+        name: The player name
+        args: A tuple of int or float arguments
+
+    """
+    name, *args = spec.split(':')
+    if name not in players:
+        raise ValueError("%s not in %s" % (name, ", ".join(players.keys())))
+    return name, tuple(int(a) if a.lstrip('-').isdigit() else float(a) for a in args)
+
+
+def player_config(spec: str):
+    """ Returns the (num_nodes, explore_faction) a player spec searches with, or (None, None) for non-MCTS bots. """
+    name, args = parse_player(spec)
+    if name in ('mcts_vanilla', 'mcts_modified'):
+        module = mcts_modules[name]
+        num_nodes, explore_faction = (args + (module.num_nodes, module.explore_faction)[len(args):])[:2]
+        return num_nodes, explore_faction
+    if name in mcts_modules:
+        return mcts_modules[name].num_nodes, mcts_modules[name].explore_faction
+    if name.startswith('exp_'):
+        num_nodes, explore_faction = (args + players[name].__defaults__[len(args):])[:2]
+        return num_nodes, explore_faction
+    return None, None
+
+
+def think_arguments(spec: str):
+    """ Returns a player spec's name with the positional and keyword arguments for its think function: the exp_
+    bots take num_nodes and explore_faction positionally, mcts_vanilla and mcts_modified as the keyword-only nn and ef.
+    """
+    name, args = parse_player(spec)
+    if name in ('mcts_vanilla', 'mcts_modified'):
+        return name, (), dict(zip(('nn', 'ef'), args))
+    return name, args, {}
+
+
+def play_game(p1: str, p2: str, seed: int):
+    """ Plays one game between two player specs.
+
+    Args:
+        p1:     The spec of player 1.
+        p2:     The spec of player 2.
+        seed:   The seed for this game.
+
+    Returns:    The game's record, in the results.py format.
+
+    """
+    random.seed(seed)
+    specs = {1: think_arguments(p1), 2: think_arguments(p2)}
+
+    state = board.starting_state()
+    move_times = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        while not board.is_ended(state):
+            name, args, kwargs = specs[board.current_player(state)]
+            start = time()
+            action = players[name](board, state, *args, **kwargs)
+            move_times.append(time() - start)
+            state = board.next_state(state, action)
+
+    final_score = board.points_values(state)
+    winner = 'draw'
+    if final_score[1] == 1:
+        winner = 1
+    elif final_score[2] == 1:
+        winner = 2
+    configs = {'1': player_config(p1), '2': player_config(p2)}
+    return dict(
+        seed=seed, p1=p1, p2=p2,
+        num_nodes={player: config[0] for player, config in configs.items()},
+        explore_faction={player: config[1] for player, config in configs.items()},
+        winner=winner, moves=len(move_times), move_times=move_times,
+    )
+
+
+def run_games(games, workers: int, pool: ProcessPoolExecutor|None = None):
+    """ Plays games and yields each result as soon as it is available.
+
+    Args:
+        games:      An iterable of (p1 spec, p2 spec, seed) triples.
+        workers:    The number of worker processes; 0 plays the games one by one in this process.
+        pool:       An already running pool to play on instead of starting one for this call.
+
+    Yields:     The result dictionary of each game, in completion order.
+
+    """
+    if workers == 0:
+        for game in games:
+            yield play_game(*game)
+        return
+
+    if pool is not None:
+        futures = [pool.submit(play_game, *game) for game in games]
+        for future in as_completed(futures):
+            yield future.result()
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from run_games(games, workers, pool)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays a match between two bots on a process pool.")
+    parser.add_argument('p1')
+    parser.add_argument('p2')
+    parser.add_argument('--rounds', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes; 0 plays serially in this process")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument('--out', help="JSON Lines file to append each game's record to")
+    args = parser.parse_args()
+
+    for spec in (args.p1, args.p2):
+        try:
+            parse_player(spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    wins = {'draw': 0, 1: 0, 2: 0}
+    games = [(args.p1, args.p2, args.seed + i) for i in range(args.rounds)]
+
+    start = time()  # To log how much time the tournament takes.
+    for result in run_games(games, args.workers):
+        wins[result['winner']] += 1
+        if args.out:
+            append_result(args.out, result)
+        print("Seed %d: winner %s after %d moves" % (result['seed'], result['winner'], result['moves']), flush=True)
+
+    print("")
+    print("Final win counts:", dict(wins))
+
+    # Also output the time elapsed.
+    end = time()
+    print(end - start, ' seconds')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import random
+from p2_t3 import PackedBoard, won_boards, empty_indices, board_codes
+
+# Playout policies for MCTS rollouts. "random" is Board.random_playout. The others play out a game like
+# random_playout does, but check two cheap tactical rules first at every ply, both computed from 9-bit
+# sub-board masks with lookup tables:
+#
+#   win-in-one:         if the player to move can complete a line in a sub-board it may play in, it does
+#                       (ending the game at once when that sub-board completes a line on the big board).
+#   avoid free choice:  otherwise it avoids cells that send the opponent to a finished sub-board, which
+#                       would let the opponent play anywhere.
+#
+# Moves are drawn uniformly from the first rule that leaves any, and from all legal moves if none does.
+
+# Rules applied by each policy: (win_in_one, avoid_free_choice).
+policies = {
+    'random': None,
+    'win': (True, False),
+    'safe': (False, True),
+    'heavy': (True, True),
+}
+
+# completing_cells[mask] is the mask of cells not in mask that would complete a line of mask.
+completing_cells = [
+    sum(1 << i for i in range(9) if not mask >> i & 1 and won_boards[mask | 1 << i])
+    for mask in range(512)
+]
+
+
+def playout(board, state, policy: str = 'heavy', rng=random):
+    """ Plays state out to the end under the named policy.
+
+    Args:
+        board:  The game setup.
+        state:  The state to play out from.
+        policy: A key of policies.
+        rng:    Source of randomness with a choice method.
+
+    Returns:    The winning player (1 or 2), or 0 for a draw.
+
+    """
+    rules = policies[policy]
+    if rules is None:
+        return board.random_playout(state, rng)
+    if isinstance(board, PackedBoard):
+        state = board.to_tuple(state)
+    return heavy_playout(state, rng, *rules)
+
+
+def heavy_playout(state, rng=random, win_in_one: bool = True, avoid_free_choice: bool = True):
+    """ Plays a game out from state, taking win-in-one moves and avoiding free-choice moves when asked to.
+
+    Args:
+        state:  A Board state tuple.
+        rng:    Source of randomness with a choice method.
+        win_in_one:         Whether to capture a sub-board whenever possible.
+        avoid_free_choice:  Whether to avoid sending the opponent to a finished sub-board.
+
+    Returns:    The winning player (1 or 2), or 0 for a draw.
+
+    """
+    boards = list(state[:18])
+    occupied = [boards[2 * x] | boards[2 * x + 1] for x in range(9)]
+    p1, p2 = state[18], state[19]
+    player_index = state[22] - 1
+    x = None if state[20] is None else 3 * state[20] + state[21]
+    choice = rng.choice
+
+    while True:
+        if won_boards[p1 & ~p2]:
+            return 1
+        if won_boards[p2 & ~p1]:
+            return 2
+        finished = p1 | p2
+        if finished == 0x1ff:
+            return 0
+
+        if x is None:
+            options = [b for b in range(9) if not finished >> b & 1]
+        else:
+            options = (x,)
+
+        code = None
+        if win_in_one:
+            captures = [
+                9 * b + i
+                for b in options
+                for i in empty_indices[~completing_cells[boards[2 * b + player_index]] & 0x1ff | occupied[b]]
+            ]
+            if captures:
+                mine = p2 & ~p1 if player_index else p1 & ~p2
+                winning = completing_cells[mine]
+                for move in captures:
+                    if winning >> (move // 9) & 1:
+                        return player_index + 1
+                code = choice(captures)
+
+        if code is None and avoid_free_choice:
+            safe = []
+            for b in options:
+                unsafe = finished
+                empty = ~occupied[b] & 0x1ff
+                # a move on cell b that finishes sub-board b also frees the opponent
+                if empty & (empty - 1) == 0 or completing_cells[boards[2 * b + player_index]] >> b & 1:
+                    unsafe |= 1 << b
+                safe.extend(board_codes[b][occupied[b] | unsafe])
+            if safe:
+                code = choice(safe)
+
+        if code is None:
+            if x is None:
+                moves = []
+                for b in options:
+                    moves.extend(board_codes[b][occupied[b]])
+                code = choice(moves)
+            else:
+                code = 9 * x + choice(empty_indices[occupied[x]])
+
+        x, cell = divmod(code, 9)
+        bit = 1 << cell
+        i = 2 * x + player_index
+        boards[i] |= bit
+        occupied[x] |= bit
+        if won_boards[boards[i]]:
+            if player_index:
+                p2 |= 1 << x
+            else:
+                p1 |= 1 << x
+        elif occupied[x] == 0x1ff:
+            p1 |= 1 << x
+            p2 |= 1 << x
+
+        player_index ^= 1
+        x = None if (p1 | p2) >> cell & 1 else cell
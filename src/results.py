@@ -0,0 +1,84 @@
+import json
+import sys
+
+# Game results as JSON Lines: one self-contained record per finished game, appended and flushed as soon as
+# the game ends, so a crashed or interrupted run keeps everything played so far. A record holds:
+#
+#   seed             the game's seed
+#   p1, p2           the player specs
+#   num_nodes        {"1": ..., "2": ...} MCTS iterations per move for each side (null for non-MCTS bots)
+#   explore_faction  {"1": ..., "2": ...} exploration constant for each side (null for non-MCTS bots)
+#   winner           1, 2 or "draw"
+#   moves            the number of moves played
+#   move_times       seconds spent choosing each move, in order (player 1 moves first)
+#
+#   python results.py results.jsonl     prints a summary table
+
+
+def append_result(path: str, record: dict):
+    """ Appends one game record to the results file at path. """
+    with open(path, 'a') as results_file:
+        results_file.write(json.dumps(record) + '\n')
+
+
+def load_results(path: str):
+    """ Yields the game records stored in the results file at path, skipping a truncated last line. """
+    with open(path) as results_file:
+        for line in results_file:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith('\n'):
+                    raise
+
+
+def summarize(records):
+    """ Aggregates game records by matchup and configuration.
+
+    Args:
+        records:    An iterable of game records.
+
+    Returns:    A dictionary mapping (p1, p2, num_nodes, explore_faction) to a dictionary with the game count,
+                win counts ('draw', 1, 2), mean moves per game and mean seconds per move for each player.
+
+    """
+    summary = {}
+    for record in records:
+        num_nodes = record['num_nodes']
+        explore_faction = record['explore_faction']
+        key = (record['p1'], record['p2'],
+               (num_nodes['1'], num_nodes['2']), (explore_faction['1'], explore_faction['2']))
+        entry = summary.get(key)
+        if entry is None:
+            entry = summary[key] = {'games': 0, 'draw': 0, 1: 0, 2: 0, 'moves': 0,
+                                    'time': [0., 0.], 'timed_moves': [0, 0]}
+        entry['games'] += 1
+        entry[record['winner']] += 1
+        entry['moves'] += record['moves']
+        for i, seconds in enumerate(record['move_times']):
+            entry['time'][i % 2] += seconds
+            entry['timed_moves'][i % 2] += 1
+
+    for entry in summary.values():
+        time, timed_moves = entry.pop('time'), entry.pop('timed_moves')
+        entry['moves'] /= entry['games']
+        entry['move_time'] = tuple(t / n if n else 0. for t, n in zip(time, timed_moves))
+    return summary
+
+
+def format_summary(summary):
+    """ Returns the summary from summarize as a text table. """
+    lines = ["%-28s %-28s %12s %12s %6s %5s %5s %5s %7s %17s" % (
+        "p1", "p2", "num_nodes", "explore", "games", "p1", "p2", "draw", "moves", "s/move (p1, p2)")]
+    for (p1, p2, num_nodes, explore_faction), entry in sorted(summary.items(), key=lambda item: str(item[0])):
+        lines.append("%-28s %-28s %12s %12s %6d %5d %5d %5d %7.1f %8.4f %8.4f" % (
+            p1, p2, "%s/%s" % num_nodes, "%s/%s" % explore_faction, entry['games'],
+            entry[1], entry[2], entry['draw'], entry['moves'], *entry['move_time']))
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Need a results file")
+        exit(1)
+    print(format_summary(summarize(load_results(sys.argv[1]))))
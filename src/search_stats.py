@@ -0,0 +1,89 @@
+import random
+from time import perf_counter
+
+# Opt-in instrumentation for mcts_vanilla.search. A search given a SearchStats times each of its four
+# phases with lap() and counts the plies of every random playout (through CountingRandom, or through
+# playout_plies on boards with compiled playouts); think then records the size and depth of the finished
+# tree. A search without one only pays for a few `is None` checks per iteration.
+
+PHASES = ('selection', 'expansion', 'simulation', 'backpropagation')
+
+
+class CountingRandom:
+    """ Wraps a source of randomness, counting choice calls. The pure-Python playout kernels make one choice
+    per ply, so passing one of these as their rng measures the length of a playout without changing its
+    moves. getrandbits is forwarded uncounted, so compiled playouts seeded from one still run compiled;
+    those boards report playout lengths through playout_plies instead.
+    """
+
+    __slots__ = ('rng', 'calls')
+
+    def __init__(self, rng=random):
+        self.rng = rng
+        self.calls = 0
+
+    def choice(self, seq):
+        self.calls += 1
+        return self.rng.choice(seq)
+
+    def getrandbits(self, k: int):
+        return self.rng.getrandbits(k)
+
+
+class SearchStats:
+    """ Per-phase timings and tree statistics collected during one think call. """
+
+    def __init__(self):
+        self.time = dict.fromkeys(PHASES, 0.)   # Phase -> cumulative seconds.
+        self.calls = dict.fromkeys(PHASES, 0)   # Phase -> number of timed calls.
+        self.rollout_lengths = {}               # Plies per playout -> number of playouts.
+        self.iterations = 0
+        self.total_time = 0.
+        self.tree_size = 0
+        self.max_depth = 0
+        self.last = 0.
+
+    def start(self):
+        """ Starts timing an iteration. """
+        self.last = perf_counter()
+
+    def lap(self, phase: str):
+        """ Adds the time since the last start or lap to phase. """
+        now = perf_counter()
+        self.time[phase] += now - self.last
+        self.calls[phase] += 1
+        self.last = now
+
+    def add_rollout(self, plies: int):
+        """ Counts one playout of the given length in the histogram. """
+        self.rollout_lengths[plies] = self.rollout_lengths.get(plies, 0) + 1
+
+    def measure_tree(self, root_node):
+        """ Records the number of nodes and the greatest depth of the tree below root_node. """
+        size, depth = 0, 0
+        frontier = [(root_node, 0)]
+        while frontier:
+            node, d = frontier.pop()
+            size += 1
+            depth = max(depth, d)
+            frontier.extend((child, d + 1) for child in node.child_list)
+        self.tree_size, self.max_depth = size, depth
+
+    def as_dict(self):
+        """ Returns the statistics as a JSON-serialisable dictionary. """
+        return dict(
+            iterations=self.iterations,
+            total_time=self.total_time,
+            phase_time=dict(self.time),
+            phase_calls=dict(self.calls),
+            tree_size=self.tree_size,
+            max_depth=self.max_depth,
+            rollout_lengths={str(plies): n for plies, n in sorted(self.rollout_lengths.items())},
+        )
+
+    def __repr__(self):
+        timed = sum(self.time.values()) or 1.
+        phases = ", ".join("%s %.1fms (%d, %.0f%%)" % (phase, 1000 * self.time[phase], self.calls[phase],
+                                                      100 * self.time[phase] / timed) for phase in PHASES)
+        return "%d iterations in %.1fms: %s; tree %d nodes, depth %d" % (
+            self.iterations, 1000 * self.total_time, phases, self.tree_size, self.max_depth)
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+
+
+class NodeStats:
+    """ Win and visit totals for one game state, shared by every tree node that reaches it. """
+
+    __slots__ = ('wins', 'visits')
+
+    def __init__(self):
+        self.wins = 0
+        self.visits = 0
+
+
+class TranspositionTable:
+    """ A bounded map from state keys to shared NodeStats.
+
+    Different move orders reach the same state; looking each new node's state up here lets all of those nodes pool
+    their playout results. When the table is full the least recently used entry is evicted. Nodes that already hold
+    an evicted entry keep using it, they just stop sharing it with nodes created later.
+    """
+
+    def __init__(self, capacity: int = 200000):
+        """
+        Args:
+            capacity:   The maximum number of states kept.
+        """
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, key):
+        """ Returns the NodeStats for key, creating it (and evicting the oldest entry if needed) when absent.
+
+        Args:
+            key:    A hashable key for the state, such as its Zobrist key or the state itself.
+
+        Returns:    The shared NodeStats for that state.
+
+        """
+        stats = self.entries.get(key)
+        if stats is None:
+            stats = self.entries[key] = NodeStats()
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return stats
@@ -0,0 +1,214 @@
+from array import array
+from math import sqrt, log
+from mcts_node import MCTSNode
+from p2_t3 import Board, encode_action, decode_action
+import mcts_vanilla
+
+# An MCTS tree kept in parallel arrays instead of one MCTSNode object per node. Node i is described by
+# visits[i], wins[i], parent[i], action[i] (the 0..80 action code, -1 at the root), first_child[i] and
+# next_sibling[i] (-1 when absent), plus untried[i], a bitmask of the action codes not yet expanded.
+# Children are linked newest first. store_search follows the selection, expansion and backpropagation
+# rules of mcts_vanilla.search (without the transposition table or multi-playout leaves), simulating
+# from the selected leaf's own state, and NodeView wraps a node so the MCTSNode helpers, like
+# tree_to_string, keep working.
+
+CHUNK = 4096    # Number of node slots added each time the arrays fill up.
+NONE = -1
+
+
+class TreeStore:
+    """ A growable, array-backed MCTS tree. """
+
+    def __init__(self):
+        self.size = 0
+        self.capacity = 0
+        self.visits = array('q')
+        self.wins = array('q')
+        self.parent = array('i')
+        self.action = array('b')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.untried = []
+
+    def grow(self):
+        """ Adds CHUNK empty slots to every array. """
+        self.visits.extend(array('q', [0]) * CHUNK)
+        self.wins.extend(array('q', [0]) * CHUNK)
+        self.parent.extend(array('i', [NONE]) * CHUNK)
+        self.action.extend(array('b', [NONE]) * CHUNK)
+        self.first_child.extend(array('i', [NONE]) * CHUNK)
+        self.next_sibling.extend(array('i', [NONE]) * CHUNK)
+        self.untried.extend([0] * CHUNK)
+        self.capacity += CHUNK
+
+    def add(self, parent: int, action: int, untried_actions):
+        """ Adds a node and links it under parent.
+
+        Args:
+            parent:             The parent's index, or NONE for the root.
+            action:             The code of the action leading to this node, or NONE for the root.
+            untried_actions:    The legal actions at the new node.
+
+        Returns:    The new node's index.
+
+        """
+        if self.size == self.capacity:
+            self.grow()
+        i = self.size
+        self.size += 1
+
+        self.parent[i] = parent
+        self.action[i] = action
+        mask = 0
+        for a in untried_actions:
+            mask |= 1 << encode_action(a)
+        self.untried[i] = mask
+        if parent != NONE:
+            self.next_sibling[i] = self.first_child[parent]
+            self.first_child[parent] = i
+        return i
+
+    def children(self, i: int):
+        """ Yields the indices of node i's children, newest first. """
+        child = self.first_child[i]
+        while child != NONE:
+            yield child
+            child = self.next_sibling[child]
+
+    def view(self, i: int = 0):
+        """ Returns an MCTSNode-compatible view of node i (the root by default). """
+        return NodeView(self, i)
+
+
+class NodeView:
+    """ A read-only MCTSNode look-alike over one TreeStore slot. """
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: TreeStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def parent(self):
+        parent = self.store.parent[self.index]
+        return None if parent == NONE else NodeView(self.store, parent)
+
+    @property
+    def parent_action(self):
+        action = self.store.action[self.index]
+        return None if action == NONE else decode_action(action)
+
+    @property
+    def child_nodes(self):
+        children = list(self.store.children(self.index))
+        return dict(
+            (decode_action(self.store.action[child]), NodeView(self.store, child))
+            for child in reversed(children)
+        )
+
+    @property
+    def untried_actions(self):
+        mask = self.store.untried[self.index]
+        return [decode_action(code) for code in range(81) if mask >> code & 1]
+
+    @property
+    def wins(self):
+        return self.store.wins[self.index]
+
+    @property
+    def visits(self):
+        return self.store.visits[self.index]
+
+    __repr__ = MCTSNode.__repr__
+    tree_to_string = MCTSNode.tree_to_string
+
+
+def best_child(store: TreeStore, i: int):
+    """ Returns the child of node i with the highest UCB (ties go to the most recently expanded), or i if it has none. """
+    visits, wins = store.visits, store.wins
+    explore_faction = mcts_vanilla.explore_faction
+    best, top_UCB = i, -1.
+    child = store.first_child[i]
+    while child != NONE:
+        n = visits[child]
+        UCB = 0 if n == 0 else wins[child] / n + explore_faction * sqrt(2 * log(n) / n)
+        if UCB > top_UCB:
+            top_UCB = UCB
+            best = child
+        child = store.next_sibling[child]
+    return best
+
+
+def store_search(board: Board, store: TreeStore, current_state, iterations: int):
+    """ Runs MCTS iterations on the tree in store, whose node 0 is the root for current_state.
+
+    Args:
+        board:          The game setup.
+        store:          The tree.
+        current_state:  The current state of the game.
+        iterations:     The number of iterations to run.
+
+    """
+    bot_identity = board.current_player(current_state)
+    visits, wins, untried = store.visits, store.wins, store.untried
+
+    for _ in range(iterations):
+        state = current_state
+        i = 0
+
+        # Selection Step
+        while not untried[i]:
+            visits[i] += 1
+            child = best_child(store, i)
+            if child == i:
+                break
+            state = board.next_state(state, decode_action(store.action[child]))
+            i = child
+
+        # Expansion Step
+        if untried[i]:
+            code = untried[i].bit_length() - 1
+            untried[i] ^= 1 << code
+            state = board.next_state(state, decode_action(code))
+            i = store.add(i, code, board.legal_actions(state))
+            visits, wins, untried = store.visits, store.wins, store.untried
+            visits[i] += 1
+
+        # Simulation Step
+        won = board.random_playout(state) == bot_identity
+
+        # Backpropogation Step
+        while i != NONE:
+            visits[i] += 1
+            wins[i] += won
+            i = store.parent[i]
+
+
+def get_best_action(store: TreeStore):
+    """ Returns the root action with the best win rate (ties go to the most recently expanded). """
+    best, best_action = float("-inf"), None
+    for child in store.children(0):
+        rate = store.wins[child] / store.visits[child]
+        if rate > best:
+            best, best_action = rate, decode_action(store.action[child])
+    return best_action
+
+
+def think(board: Board, current_state):
+    """ Performs MCTS using an array-backed tree.
+
+    Args:
+        board:  The game setup.
+        current_state:  The current state of the game.
+
+    Returns:    The action to be taken from the current state
+
+    """
+    store = TreeStore()
+    store.add(NONE, NONE, board.legal_actions(current_state))
+    store_search(board, store, current_state, mcts_vanilla.num_nodes)
+    best_action = get_best_action(store)
+
+    print(f"Action chosen: {best_action}")
+    return best_action